@@ -22,29 +22,96 @@ files.
 
 import os
 import json
+import functools
+import contextlib
+import mmap
 import string
 import hashlib
+import sys
+import threading
+import multiprocessing
+import warnings
+from array import array
+from itertools import accumulate, compress, repeat
+from operator import add
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import Optional, Union
 
 import fast_jsonl as fj
 
+try:
+    import orjson
+
+    def _loads(data):
+        try:
+            return orjson.loads(data)
+        except ValueError:
+            # orjson rejects some documents that the json module accepts
+            # (e.g. integers wider than 64 bits), so retry with json.
+            return json.loads(data)
+
+    _dumps = orjson.dumps
+except ImportError:
+    _loads = json.loads
+
+    def _dumps(data):
+        return json.dumps(data, separators=(",", ":")).encode()
+
+
+try:
+    import blake3
+except ImportError:
+    blake3 = None
+
+HASH_ALGORITHMS = {
+    "sha256": hashlib.sha256,
+    "blake2b": hashlib.blake2b,
+}
+if blake3 is not None:
+    HASH_ALGORITHMS["blake3"] = blake3.blake3
+DEFAULT_HASH_ALGORITHM = "blake3" if blake3 is not None else "blake2b"
+
+BASE62 = (string.digits + string.ascii_letters).encode("ascii")
+# every pair of base62 digits, indexed by the pair's value
+BASE62_PAIRS = [bytes([BASE62[i // 62], BASE62[i % 62]]) for i in range(3844)]
+
+# values of `check_cache` accepted by `cache_init`
+CACHE_CHECKS = (None, "time", "auto")
+
+# per-thread scratch buffers reused when files are hashed in chunks
+_hash_buffers = threading.local()
+
+
+def ensure_dir(path):
+    r"""
+    Create a directory (and its parents) if it does not exist.
+
+    This is only called when a cache or lock file is about to be written, so
+    the directory is checked every time rather than remembered; it may have
+    been deleted since it was last created (e.g., to clear the caches).
+
+    Args:
+        path (str or pathlike): The directory path.
+    """
+    os.makedirs(path, exist_ok=True)
+
 
 def get_text_hash(text, algorithm=hashlib.sha256):
-    file_hash = algorithm()
-    file_hash.update(text.encode())
-    return base10_to_base62(base16_to_base10(file_hash.hexdigest()))
+    return digest_to_base62(algorithm(text.encode()).digest())
 
 
 def filepath_to_cachepath_local(file_path):
     r"""
     Get a cache file path based on the location of the given file path.
     """
+    return _filepath_to_cachepath_local(os.fspath(file_path))
+
+
+@functools.lru_cache(maxsize=1024)
+def _filepath_to_cachepath_local(file_path):
     path = Path(file_path)
-    cache_dir = path.parent / ".fj_cache"
-    cache_dir.mkdir(parents=True, exist_ok=True)
-    collision_dir = cache_dir / path.stem
-    collision_dir.mkdir(exist_ok=True)
+    collision_dir = path.parent / ".fj_cache" / path.stem
     return collision_dir / f"{get_text_hash(path.name)}.cache.json"
 
 
@@ -52,17 +119,30 @@ def filepath_to_cachepath_user(file_path):
     r"""
     Get a cache file path based on the user's home directory.
     """
-    path = Path(file_path)
-    cache_dir = Path.home() / ".local/share/fj_cache"
-    cache_dir.mkdir(parents=True, exist_ok=True)
-    posix_path = path.resolve().as_posix()
+    # resolve symlinks before the memoized call so that a link pointed at a
+    # new target maps to the new target's cache
+    return _filepath_to_cachepath_user(
+        os.path.realpath(file_path),
+        os.fspath(Path.home()),
+    )
+
+
+@functools.lru_cache(maxsize=1024)
+def _filepath_to_cachepath_user(file_path, home):
+    posix_path = Path(file_path).as_posix()
     name = posix_path.replace("/", "--")
-    collision_dir = cache_dir / name
-    collision_dir.mkdir(exist_ok=True)
+    collision_dir = Path(home) / ".local/share/fj_cache" / name
     hashed_name = get_text_hash(posix_path)
     return collision_dir / f"{hashed_name}.cache.json"
 
 
+# maps values of `fast_jsonl.constants.DIR_METHOD` to cache path functions
+CACHEPATH_METHODS = {
+    "local": filepath_to_cachepath_local,
+    "user": filepath_to_cachepath_user,
+}
+
+
 def filepath_to_cachepath(file_path):
     r"""
     Get an inferred cache path for a given file path.
@@ -83,124 +163,671 @@ def filepath_to_cachepath(file_path):
     (from the "/" -> "--" modification) while still being (mostly) human
     readible.
 
+    Cache paths are memoized and no directories are created here; the cache
+    directory is created by :func:`make_cache` when a cache is saved.
+
     Args:
         file_path (str or pathlike): The path to the target JSONL file.
     """
-    if fj.constants.DIR_METHOD == "local":
-        return filepath_to_cachepath_local(file_path)
-    elif fj.constants.DIR_METHOD == "user":
-        return filepath_to_cachepath_user(file_path)
-    else:
+    method = CACHEPATH_METHODS.get(fj.constants.DIR_METHOD)
+    if method is None:
         message = (
             f"Unknown value for {fj.constants.DIR_METHOD_ENV} environment "
             f'variable: "{fj.constants.DIR_METHOD}".'
         )
         raise ValueError(message)
+    return method(file_path)
 
 
-def scan_lines(file_path):
-    r"""Scan a JSONL file and generate cache data."""
-    data = dict()
-    f = open(file_path, "r")
-    index = 0
-    position = 0
-    line = f.readline()
-    while True:
-        if line.endswith("\n"):
-            line = line[:-1]
-        elif line == "":
-            break
-        try:
-            json_data = json.loads(line)
-            data[index] = position
-            index += 1
-        except:
-            pass
-        position = f.tell()
-        line = f.readline()
-    return data
+def advise_sequential(mm, start=0, end=None):
+    r"""
+    Hint that a region of a memory-mapped file will be read once, in order.
+
+    The kernel is asked to read ahead aggressively and to start reading the
+    first :data:`fast_jsonl.constants.WILLNEED_SIZE` bytes of the region
+    immediately. This does nothing where `madvise` is not available.
+
+    Args:
+        mm (mmap.mmap): The memory-mapped file.
+        start (int, optional): The offset of the start of the region.
+            Defaults to 0.
+        end (int, optional): The offset of the end of the region. If None,
+            the end of the file.
+            Defaults to None.
+    """
+    if not hasattr(mmap, "MADV_SEQUENTIAL"):  # e.g., on Windows
+        return
+    if end is None:
+        end = len(mm)
+    if end <= start:
+        return
+    # advise whole pages; regions must start on a page boundary
+    start -= start % mmap.PAGESIZE
+    end = min(end + -end % mmap.PAGESIZE, len(mm))
+    mm.madvise(mmap.MADV_SEQUENTIAL, start, end - start)
+    willneed = min(end - start, fj.constants.WILLNEED_SIZE)
+    mm.madvise(mmap.MADV_WILLNEED, start, willneed)
+
+
+def scan_offsets(mm, start, end, validate=False, file_hash=None):
+    r"""
+    Return the offsets of the non-blank lines in a memory-mapped file region.
+
+    Args:
+        mm (mmap.mmap): The memory-mapped JSONL file.
+        start (int): The offset at which to start scanning. This must be the
+            start of a line.
+        end (int): The offset at which to stop scanning. This must be the end
+            of the file or directly follow a newline.
+        validate (bool, optional): If True, only lines that can be parsed as
+            JSON are recorded.
+            Defaults to False.
+        file_hash (hash object, optional): If given, the region's contents
+            are also fed to this hash (e.g., from :data:`HASH_ALGORITHMS`\)
+            in the same pass.
+            Defaults to None.
+    """
+    offsets = array("Q")
+    append = offsets.append
+    find = mm.find
+    position = start
+    if validate:
+        # the final line may not end with a newline, so it is handled after
+        # the loop rather than checking for the end of the region every line.
+        while (line_end := find(b"\n", position, end)) != -1:
+            if line_end > position and is_json(mm[position:line_end]):
+                append(position)
+            position = line_end + 1
+        if position < end and is_json(mm[position:end]):
+            append(position)
+        if file_hash is not None:
+            # hash through a view of the map rather than copying the region
+            with memoryview(mm) as view:
+                file_hash.update(view[start:end])
+    else:
+        # split blocks of whole lines and accumulate the line lengths so that
+        # offsets are computed by C-level iterators rather than a Python loop
+        block_size = fj.constants.SCAN_BLOCK_SIZE
+        while position < end:
+            stop = min(position + block_size, end)
+            if stop < end:
+                line_end = mm.rfind(b"\n", position, stop)
+                if line_end == -1:  # the line is longer than the block
+                    line_end = find(b"\n", stop, end)
+                stop = end if line_end == -1 else line_end + 1
+            block = mm[position:stop]
+            if file_hash is not None:
+                file_hash.update(block)  # while the block is still in cache
+            lines = block.split(b"\n")
+            lengths = map(len, lines)
+            starts = accumulate(map(add, lengths, repeat(1)), initial=position)
+            # skip blank lines, including whitespace-only and CRLF blank lines
+            offsets.extend(compress(starts, map(bytes.strip, lines)))
+            position = stop
+    return offsets
+
+
+def scan_lines(file_path, validate=False, file_hash=None):
+    r"""
+    Scan a JSONL file and return the byte offset of each line.
+
+    The file is memory-mapped and line offsets are found by searching for
+    newlines, so lines are only decoded if `validate` is True. Offsets are
+    returned as an unsigned 64-bit `array.array` where the i-th item is the
+    offset of the i-th line.
+
+    Args:
+        file_path (str or pathlike): The path to the target JSONL file.
+        validate (bool, optional): If True, only lines that can be parsed as
+            JSON are recorded. Blank lines are always skipped.
+            Defaults to False.
+        file_hash (hash object, optional): See :func:`scan_offsets`\.
+            Defaults to None.
+    """
+    with open(file_path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:  # empty files cannot be memory-mapped
+            return array("Q")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            advise_sequential(mm)
+            offsets = scan_offsets(
+                mm,
+                0,
+                size,
+                validate=validate,
+                file_hash=file_hash,
+            )
+    return offsets
+
+
+def _scan_chunk(file_path, start, end, validate):
+    with open(file_path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            advise_sequential(mm, start, end)
+            return scan_offsets(mm, start, end, validate=validate)
+
+
+def can_start_processes():
+    r"""
+    Return True iff a process pool can safely be started from here.
+
+    Daemonic processes (e.g., `multiprocessing.Pool` or DataLoader workers)
+    cannot have children, and forking from a thread other than the main
+    thread can deadlock the child.
+    """
+    return (
+        not multiprocessing.current_process().daemon
+        and threading.current_thread() is threading.main_thread()
+    )
+
+
+def scan_lines_parallel(file_path, workers=None, validate=False):
+    r"""
+    Scan a JSONL file with a pool of processes and return line offsets.
+
+    The file is split into (at most) `workers` chunks at line boundaries and
+    each chunk is scanned by :func:`scan_offsets` in a separate process.
+    Processes are used rather than threads since scanning holds the GIL. The
+    file is scanned serially if :func:`can_start_processes` is False.
+
+    Args:
+        file_path (str or pathlike): The path to the target JSONL file.
+        workers (int, optional): The number of processes to use. If None, the
+            number of CPUs is used.
+            Defaults to None.
+        validate (bool, optional): See :func:`scan_lines`\.
+            Defaults to False.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    with open(file_path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return array("Q")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            chunk_size = max(size // workers, 1)
+            bounds = [0]
+            for i in range(1, workers):
+                split = mm.find(b"\n", max(i * chunk_size, bounds[-1]))
+                if split == -1 or split + 1 >= size:
+                    break
+                bounds.append(split + 1)
+            bounds.append(size)
+    if len(bounds) == 2 or not can_start_processes():
+        return scan_lines(file_path, validate=validate)
+    with ProcessPoolExecutor(max_workers=len(bounds) - 1) as executor:
+        futures = [
+            executor.submit(_scan_chunk, file_path, start, end, validate)
+            for start, end in zip(bounds[:-1], bounds[1:])
+        ]
+        offsets = array("Q")
+        for future in futures:
+            offsets.extend(future.result())
+    return offsets
+
+
+def is_json(line):
+    r"""Return True iff `line` can be parsed as JSON."""
+    try:
+        _loads(line)
+    except ValueError:
+        return False
+    return True
 
 
 def get_mtime(path):
     return Path(path).stat().st_mtime
 
 
+def get_mtime_ns(path):
+    return os.stat(path).st_mtime_ns
+
+
 def base16_to_base10(value):
     return int(value, 16)
 
 
 def base10_to_base62(value):
-    base = 62
-    BASE62 = string.digits + string.ascii_letters
-    MAP62 = {i: char for i, char in enumerate(BASE62)}
+    # convert two digits per division to halve the number of bignum divmods
     output = list()
-    while value >= base:
-        output.append(value % base)
-        value = value // base
-    output.append(value)
-    output = output[::-1]
-    return "".join([MAP62[x] for x in output])
+    while value >= 3844:
+        value, remainder = divmod(value, 3844)
+        output.append(BASE62_PAIRS[remainder])
+    output.append(BASE62_PAIRS[value].lstrip(b"0") or b"0")
+    output.reverse()
+    return b"".join(output).decode("ascii")
 
 
-def get_file_hash(file_path, algorithm=hashlib.sha256, chunksize=8192):
-    with open(file_path, "rb") as f:
-        file_hash = algorithm()
-        while chunk := f.read(chunksize):
-            file_hash.update(chunk)
-    return base10_to_base62(base16_to_base10(file_hash.hexdigest()))
+def digest_to_base62(digest):
+    r"""
+    Encode a hash digest (bytes) in base62.
+
+    Equivalent to `base10_to_base62(base16_to_base10(hexdigest))` without
+    the round trip through a hex string.
+    """
+    return base10_to_base62(int.from_bytes(digest, "big"))
+
+
+def _hash_buffer(size):
+    r"""
+    Return a view of this thread's scratch buffer with the given size.
+    """
+    buffer = getattr(_hash_buffers, "buffer", None)
+    if buffer is None or len(buffer) < size:
+        buffer = _hash_buffers.buffer = bytearray(size)
+    return memoryview(buffer)[:size]
 
 
-def scan_meta(file_path):
-    if isinstance(file_path, str):
-        file_path = Path(file_path)
+def get_file_hash(file_path, algorithm=None, chunksize=1024 * 1024):
+    r"""
+    Hash the contents of a file.
+
+    Args:
+        file_path (str or pathlike): The path to the target file.
+        algorithm (str or callable, optional): A key of
+            :data:`HASH_ALGORITHMS` or a hash constructor. If None,
+            :data:`DEFAULT_HASH_ALGORITHM` is used.
+            Defaults to None.
+        chunksize (int, optional): The read size used when the file is hashed
+            in chunks.
+            Defaults to 1 MiB.
+    """
+    if algorithm is None:
+        algorithm = DEFAULT_HASH_ALGORITHM
+    if isinstance(algorithm, str):
+        algorithm = HASH_ALGORITHMS[algorithm]
+    if blake3 is not None and algorithm is blake3.blake3:
+        # blake3 memory-maps and hashes the file without Python-level reads,
+        # splitting large files between threads
+        max_threads = 1
+        if os.stat(file_path).st_size > fj.constants.THREADED_HASH_SIZE:
+            max_threads = algorithm.AUTO
+        file_hash = algorithm(max_threads=max_threads)
+        file_hash.update_mmap(file_path)
+        return digest_to_base62(file_hash.digest())
+    with open(file_path, "rb") as f:
+        if hasattr(os, "posix_fadvise"):  # not available on Windows or macOS
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        size = os.fstat(f.fileno()).st_size
+        if size >= fj.constants.MMAP_HASH_SIZE:
+            # hash straight from the page cache without copying into buffers
+            file_hash = algorithm()
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                advise_sequential(mm)
+                file_hash.update(mm)
+        elif hasattr(hashlib, "file_digest"):  # Python 3.11+
+            file_hash = hashlib.file_digest(f, algorithm)
+        else:
+            file_hash = algorithm()
+            # reuse one buffer per thread rather than allocating new chunks
+            view = _hash_buffer(chunksize)
+            while size := f.readinto(view):
+                file_hash.update(view[:size])
+    return digest_to_base62(file_hash.digest())
+
+
+def scan_meta(file_path, file_hash=None):
+    r"""
+    Return the metadata recorded in a cache for the target file.
+
+    Args:
+        file_path (str or pathlike): The path to the target file.
+        file_hash (hash object, optional): A :data:`DEFAULT_HASH_ALGORITHM`
+            hash that has already been fed the file's contents. If None, the
+            file is hashed with :func:`get_file_hash`\.
+            Defaults to None.
+    """
+    # resolve the path once and reuse it for every lookup below
+    resolved = os.path.realpath(file_path)
+    stat = os.stat(resolved)
+    if file_hash is None:
+        hashed = get_file_hash(resolved, algorithm=DEFAULT_HASH_ALGORITHM)
+    else:
+        hashed = digest_to_base62(file_hash.digest())
     return {
-        "path": file_path.resolve().as_posix(),
-        "mtime": get_mtime(file_path),
-        "hash": get_file_hash(file_path),
+        "path": resolved.replace(os.sep, "/"),
+        "mtime": stat.st_mtime,
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "ino": stat.st_ino,
+        "hash": hashed,
+        "hash_alg": DEFAULT_HASH_ALGORITHM,
     }
 
 
-def generate_cache_data(file_path):
+def generate_cache_data(file_path, validate=False, workers=1):
+    if workers is None:
+        workers = os.cpu_count() or 1
+    size = os.path.getsize(file_path)
+    if (
+        workers > 1
+        and size >= fj.constants.PARALLEL_SCAN_SIZE
+        and can_start_processes()
+    ):
+        lines = scan_lines_parallel(
+            file_path,
+            workers=workers,
+            validate=validate,
+        )
+        file_hash = None
+    else:
+        # hash the file in the same pass as the line scan
+        file_hash = HASH_ALGORITHMS[DEFAULT_HASH_ALGORITHM]()
+        lines = scan_lines(file_path, validate=validate, file_hash=file_hash)
     return {
-        "meta": scan_meta(file_path),
-        "lines": scan_lines(file_path),
+        "version": fj.constants.CACHE_VERSION,
+        "meta": scan_meta(file_path, file_hash=file_hash),
+        "count": len(lines),
+        "lines": lines,
     }
 
 
+@contextlib.contextmanager
+def atomic_open(path, mode="w"):
+    r"""
+    Open a temporary file for writing that replaces `path` once closed.
+
+    If an error is raised while writing, `path` is left unchanged.
+    """
+    path = os.fspath(path)
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(temp_path, mode) as f:
+            yield f
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
 def save_json(data, path):
-    with open(path, "w") as f:
-        json.dump(data, f)
+    with atomic_open(path, "wb") as f:
+        f.write(_dumps(data))
 
 
 def load_json(path):
     with open(path, "rb") as f:
-        return json.load(f)
+        return _loads(f.read())
+
+
+def get_offsets_path(cache_path):
+    r"""
+    Get the path of the binary line offsets file that accompanies a cache file.
+    """
+    return Path(f"{os.fspath(cache_path)}.offsets")
+
+
+def save_offsets(offsets, path):
+    r"""
+    Save line offsets to a binary file.
+
+    The file starts with an 8-byte header
+    (:data:`fast_jsonl.constants.OFFSETS_MAGIC` followed by the cache version
+    and three reserved bytes) and is followed by the offsets as little-endian
+    unsigned 64-bit integers.
+
+    Args:
+        offsets (array.array): The line offsets.
+        path (str or pathlike): The path to save to.
+    """
+    if sys.byteorder == "big":
+        offsets = array("Q", offsets)
+        offsets.byteswap()
+    version = bytes([fj.constants.CACHE_VERSION, 0, 0, 0])
+    header = fj.constants.OFFSETS_MAGIC + version
+    with atomic_open(path, "wb") as f:
+        f.write(header)
+        offsets.tofile(f)
+
+
+def load_offsets(path, count=None):
+    r"""
+    Load line offsets saved with :func:`save_offsets`\.
+
+    The offsets are copied into memory rather than memory-mapped so that the
+    file can be regenerated while a reader is still open.
+
+    Args:
+        path (str or pathlike): The path to the binary offsets file.
+        count (int, optional): The expected number of offsets (the cache's
+            "count"). If given, a ValueError is raised if the file holds a
+            different number of offsets, e.g., if it was replaced by another
+            process after the cache file was read.
+            Defaults to None.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    version = bytes([fj.constants.CACHE_VERSION])
+    header = fj.constants.OFFSETS_MAGIC + version
+    if data[: len(header)] != header:
+        message = f'Unrecognized line offsets file format at "{path}".'
+        raise ValueError(message)
+    offsets = array("Q")
+    offsets.frombytes(memoryview(data)[8:])
+    if sys.byteorder == "big":
+        offsets.byteswap()
+    if count is not None and len(offsets) != count:
+        message = (
+            f"Expected {count} line offsets but found {len(offsets)} at "
+            f'"{path}".'
+        )
+        raise ValueError(message)
+    return offsets
 
 
-def make_cache(file_path, cache_path=None, cache=None):
+def make_cache(
+    file_path,
+    cache_path=None,
+    cache=None,
+    validate=False,
+    workers=1,
+):
     if cache is None:
-        cache = generate_cache_data(file_path)
+        cache = generate_cache_data(
+            file_path,
+            validate=validate,
+            workers=workers,
+        )
     if cache_path is None:
         cache_path = filepath_to_cachepath(file_path)
-    save_json(cache, cache_path)
+    ensure_dir(os.path.dirname(os.path.abspath(cache_path)))
+    # write the offsets first so that a cache file is never saved without them
+    save_offsets(cache["lines"], get_offsets_path(cache_path))
+    save_json(
+        {key: value for key, value in cache.items() if key != "lines"},
+        cache_path,
+    )
     return cache
 
 
-def load_cache(cache_path):
+def load_cache(cache_path, load_lines=True):
     data = load_json(cache_path)
-    data["lines"] = {int(ind): pos for ind, pos in data["lines"].items()}
+    if cache_version_valid(data):
+        offsets_path = get_offsets_path(cache_path)
+        if load_lines:
+            data["lines"] = load_offsets(offsets_path, data.get("count"))
+        elif not offsets_path.exists():
+            message = f'No line offsets file found at "{offsets_path}"!'
+            raise FileNotFoundError(message)
+        elif os.stat(offsets_path).st_size != 8 + 8 * data.get("count", 0):
+            # check the count without reading the offsets
+            message = (
+                f'The line offsets file at "{offsets_path}" does not match '
+                "the cache's line count."
+            )
+            raise ValueError(message)
     return data
 
 
 def cache_exists(*, file_path=None, cache_path=None):
     r"""
-    Return True iff a cache file exists at the target `cache_path`\.
+    Return True iff a cache file and its line offsets file exist at the target
+    `cache_path`\.
     """
     if cache_path is None:
         cache_path = filepath_to_cachepath(file_path)
     else:
         cache_path = Path(cache_path)
-    return cache_path.exists()
+    return cache_path.exists() and get_offsets_path(cache_path).exists()
+
+
+def get_cache_file_id(cache_path):
+    r"""
+    Return a value that changes whenever the cache file is rewritten, or None
+    if the cache file does not exist.
+    """
+    try:
+        stat = os.stat(cache_path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def resolve_check_cache(
+    check_cache=None,
+    check_cache_time=False,
+    check_cache_hash=False,
+    stacklevel=1,
+):
+    r"""
+    Return the cache check to perform given the deprecated boolean flags.
+
+    `check_cache_time=True` is an alias of `check_cache="time"` and
+    `check_cache_hash=True` is an alias of `check_cache="auto"`\. An explicit
+    `check_cache` takes precedence over either flag.
+
+    See :func:`cache_init` for argument details.
+
+    Args:
+        stacklevel (int, optional): The stack level that deprecation warnings
+            are attributed to, where 1 is the caller of this function. Public
+            entry points pass 2 so that warnings point at their caller.
+            Defaults to 1.
+    """
+    # the hash check comes first since it is used when both flags are set
+    for flag, value, check in [
+        ("check_cache_hash", check_cache_hash, "auto"),
+        ("check_cache_time", check_cache_time, "time"),
+    ]:
+        if value:
+            message = (
+                f'`{flag}=True` is deprecated, use `check_cache="{check}"` '
+                "instead."
+            )
+            warnings.warn(
+                message,
+                DeprecationWarning,
+                stacklevel=stacklevel + 1,
+            )
+            if check_cache is None:
+                check_cache = check
+    if check_cache not in CACHE_CHECKS:
+        message = (
+            f'Unknown value for check_cache: "{check_cache}". Expected one '
+            f"of {CACHE_CHECKS}."
+        )
+        raise ValueError(message)
+    return check_cache
+
+
+def load_valid_cache(
+    path,
+    cache_path,
+    check_cache=None,
+    load_lines=True,
+    lock=True,
+):
+    r"""
+    Load an existing cache, or return None if it is missing or invalid.
+
+    See :func:`cache_init` for argument details.
+
+    Args:
+        lock (bool, optional): If True, the file lock is acquired to refresh
+            the cache metadata (see :func:`refresh_cache_meta`\). Pass False
+            if the caller already holds the lock.
+            Defaults to True.
+    """
+    cache_id = get_cache_file_id(cache_path)
+    try:
+        cache = load_cache(cache_path, load_lines=load_lines)
+    except (OSError, ValueError):  # e.g., missing or corrupted cache files
+        return None
+    if not cache_version_valid(cache):
+        return None
+    if check_cache == "time" and not cache_time_valid(path, cache):
+        return None
+    if check_cache == "auto" and not cache_stat_valid(path, cache):
+        # stat before hashing so that later changes to the file are caught by
+        # the next check
+        stat = os.stat(path)
+        if not cache_hash_valid(path, cache):
+            return None
+        refresh_cache_meta(
+            cache,
+            cache_path,
+            stat,
+            cache_id=cache_id,
+            lock=lock,
+        )
+    return cache
+
+
+def refresh_cache_meta(cache, cache_path, stat, cache_id=None, lock=True):
+    r"""
+    Record new file stats in a cache whose content hash is still valid.
+
+    This lets the next `check_cache="auto"` check skip hashing a file that was
+    touched or copied without being changed. Only the cache file is
+    rewritten; the line offsets are left untouched.
+
+    Args:
+        cache (dict): The loaded cache. Its metadata is updated in place.
+        cache_path (str or pathlike): The path to the cache file.
+        stat (os.stat_result): The stats of the cached file.
+        cache_id (tuple, optional): The :func:`get_cache_file_id` of the cache
+            file when `cache` was loaded. If given, the cache file is only
+            rewritten if it has not been replaced since (e.g., by another
+            process that regenerated the cache).
+            Defaults to None.
+        lock (bool, optional): If True, the cache file is rewritten while
+            holding its file lock. Pass False if the caller already holds it.
+            Defaults to True.
+    """
+    cache["meta"].update(
+        mtime=stat.st_mtime,
+        mtime_ns=stat.st_mtime_ns,
+        size=stat.st_size,
+        ino=stat.st_ino,
+    )
+    with contextlib.suppress(OSError):  # e.g., a read-only cache directory
+        if lock:
+            file_lock = fj.lock.Lock(cache_path)
+            file_lock.acquire()
+        try:
+            if cache_id is None or get_cache_file_id(cache_path) == cache_id:
+                save_json(
+                    {
+                        key: value
+                        for key, value in cache.items()
+                        if key != "lines"
+                    },
+                    cache_path,
+                )
+        finally:
+            if lock:
+                file_lock.release()
+
+
+def cache_version_valid(cache):
+    r"""
+    Return True iff the cache was saved with the current cache format.
+
+    Args:
+        cache (dict): The loaded cache.
+    """
+    return cache.get("version") == fj.constants.CACHE_VERSION
 
 
 def cache_time_valid(file_path, cache):
@@ -211,9 +838,33 @@ def cache_time_valid(file_path, cache):
         file_path (str or pathlike, optional): The path to the target file.
         cache (dict): The loaded cache.
     """
-    cached_mtime = cache["meta"]["mtime"]
-    file_mtime = get_mtime(file_path)
-    return cached_mtime >= file_mtime
+    meta = cache["meta"]
+    if "mtime_ns" in meta:  # compare exactly rather than as rounded floats
+        return meta["mtime_ns"] >= get_mtime_ns(file_path)
+    return meta["mtime"] >= get_mtime(file_path)
+
+
+def cache_stat_valid(file_path, cache):
+    r"""
+    Return True iff the file's mtime, size, and inode match the saved values.
+
+    This is used to skip hashing files that are very likely unchanged.
+
+    Args:
+        file_path (str or pathlike, optional): The path to the target file.
+        cache (dict): The loaded cache.
+    """
+    meta = cache["meta"]
+    stat = os.stat(file_path)
+    if "mtime_ns" in meta:
+        mtime_valid = meta["mtime_ns"] == stat.st_mtime_ns
+    else:  # not recorded by older caches
+        mtime_valid = meta["mtime"] == stat.st_mtime
+    return (
+        mtime_valid
+        and meta.get("size") == stat.st_size
+        and meta.get("ino") == stat.st_ino
+    )
 
 
 def cache_hash_valid(file_path, cache):
@@ -221,14 +872,22 @@ def cache_hash_valid(file_path, cache):
     Return True iff the file hash matches the saved hash.
 
     This function may be slow for very large JSONL files since the entire file
-    must be hashed.
+    must be hashed. Files whose size differs from the saved size are rejected
+    without hashing.
 
     Args:
         file_path (str or pathlike, optional): The path to the target file.
         cache (dict): The loaded cache.
     """
+    # caches saved before "hash_alg" was recorded always used sha256
+    algorithm = cache["meta"].get("hash_alg", "sha256")
+    if algorithm not in HASH_ALGORITHMS:  # e.g., blake3 is not installed
+        return False
+    size = cache["meta"].get("size")  # not recorded by older caches
+    if size is not None and os.stat(file_path).st_size != size:
+        return False
     cached_hash = cache["meta"]["hash"]
-    file_hash = get_file_hash(file_path)
+    file_hash = get_file_hash(file_path, algorithm=algorithm)
     return cached_hash == file_hash
 
 
@@ -238,6 +897,10 @@ def cache_init(
     force_cache: bool = False,
     check_cache_time: bool = False,
     check_cache_hash: bool = False,
+    check_cache: Optional[str] = None,
+    validate: bool = False,
+    workers: Optional[int] = 1,
+    load_lines: bool = True,
     **kwargs,
 ):
     r"""
@@ -250,29 +913,57 @@ def cache_init(
             If `cache_path` is None, the correct cache path will be inferred
             from `path` (see :func:`filepath_to_cachepath` for more details).
             If a cache exists at the given or inferred `cache_path`\, the
-            default behavior is to use the existing cache (see `force_cache`\,
-            `check_cache_time`\, and `check_cache_has` arguments for overriding
-            this behavior).
+            default behavior is to use the existing cache (see `force_cache`
+            and `check_cache` arguments for overriding this behavior).
             Defaults to None.
         force_cache (bool, optional): If True, a new cache will always be
             created.
             Defaults to False.
-        check_cache_time (bool, optional): If True and a cache already exists
-            at the given or inferred `cache_path`\, the last modified time of
-            the file at `path` is compared to the recorded time in the cache.
-            If the file's last modified time is newer, a new cache is
-            generated.
+        check_cache_time (bool, optional): Deprecated alias of
+            `check_cache="time"`\.
             Defaults to False.
-        check_cache_has (bool, optional): If True and a cache already exists
-            at the given or inferred `cache_path`\, the hash of the file at
-            `path` is compared to the recorded hash in the cache. If the hashes
-            do not match, a new cache is generated.
+        check_cache_hash (bool, optional): Deprecated alias of
+            `check_cache="auto"`\.
+            Defaults to False.
+        check_cache (str, optional): How to check that an existing cache at
+            the given or inferred `cache_path` is still valid. If "time", the
+            last modified time of the file at `path` is compared to the
+            recorded time in the cache and a new cache is generated if the
+            file is newer. If "auto", the cache is valid if the file's mtime,
+            size, and inode match the recorded values; otherwise the file is
+            hashed and a new cache is generated if the hash differs from the
+            recorded hash. If the hashes match, the recorded stats are updated
+            so that the file is not hashed again. If None, existing caches are
+            not checked.
+            Defaults to None.
+        validate (bool, optional): If True, lines that cannot be parsed as
+            JSON are skipped when generating a new cache. Otherwise, lines are
+            indexed without being parsed.
             Defaults to False.
+        workers (int, optional): The number of processes to use when
+            generating a cache for files of at least
+            :data:`fast_jsonl.constants.PARALLEL_SCAN_SIZE` bytes. If None,
+            the number of CPUs is used. Files are scanned serially in
+            daemonic processes (e.g., DataLoader workers) and threads other
+            than the main thread, where a process pool cannot be started
+            safely (see :func:`can_start_processes`\).
+            Defaults to 1.
+        load_lines (bool, optional): If False, an existing valid cache is
+            returned without its line offsets (the "lines" key), which avoids
+            reading the offsets file when only the cache's validity matters.
+            Newly generated caches always include their line offsets.
+            Defaults to True.
 
     Note:
         :func:`cache_init` is called by :class:`fast_jsonl.reader.Reader` to
         initialize the cache for a file.
     """
+    check_cache = resolve_check_cache(
+        check_cache,
+        check_cache_time=check_cache_time,
+        check_cache_hash=check_cache_hash,
+        stacklevel=2,
+    )
     if not Path(path).exists():
         message = f'No file found at specified file path "{path}"!'
         raise FileNotFoundError(message)
@@ -285,28 +976,39 @@ def cache_init(
         )
         assert Path(cache_path).resolve() != Path(path).resolve(), message
 
+    cache_id = get_cache_file_id(cache_path)
+    if not force_cache and cache_id is not None:
+        cache = load_valid_cache(
+            path,
+            cache_path,
+            check_cache=check_cache,
+            load_lines=load_lines,
+        )
+        if cache is not None:
+            return cache
+
+    # only lock when writing; cache files are replaced atomically so readers
+    # never see partially written files.
     lock = fj.lock.Lock(cache_path)  # better to lock the shorter `path` file?
     lock.acquire()
-
-    if force_cache:
-        cache = make_cache(path, cache_path=cache_path)
-    else:
+    try:
         cache = None
-
-    if not cache_exists(cache_path=cache_path):
-        cache = make_cache(path, cache_path=cache_path)
-    else:
-        cache = load_cache(cache_path)
-
-    if check_cache_time and cache and not cache_time_valid(path, cache):
-        cache = make_cache(path, cache_path=cache_path)
-
-    if check_cache_hash and cache and not cache_hash_valid(path, cache):
-        cache = make_cache(path, cache_path=cache_path)
-
-    # cache exists and is valid
-    if cache is None:
-        cache = load_cache(cache_path)
-
-    lock.release()
+        if not force_cache and get_cache_file_id(cache_path) != cache_id:
+            # another process saved a new cache while we waited for the lock
+            cache = load_valid_cache(
+                path,
+                cache_path,
+                check_cache=check_cache,
+                load_lines=load_lines,
+                lock=False,
+            )
+        if cache is None:
+            cache = make_cache(
+                path,
+                cache_path=cache_path,
+                validate=validate,
+                workers=workers,
+            )
+    finally:
+        lock.release()
     return cache
@@ -18,8 +18,10 @@ CLI for basic cache management.
 Use `fj_precache` (mapped to :func:`precache`) from a shell to precache one or
 more files. The following flags can be specified:
 * `--files`\: A comma-separated list of files to cache.
-* `--threads`\: The number of threads to use for caching. Each thread can
-  process one file at a time.
+* `--threads`\: The number of worker processes to use for caching. Each
+  worker can process one file at a time. Threads are used instead of
+  processes if the `FAST_JSONL_PRECACHE_EXECUTOR` environment variable is set
+  to "thread" (see :mod:`fast_jsonl.constants`).
 * `--verbose`\: Print progress.
 """
 
@@ -28,7 +30,8 @@ import logging
 logger = logging.getLogger(__name__)
 
 import argparse
-from concurrent.futures import ThreadPoolExecutor
+import warnings
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 
 import fast_jsonl as fj
@@ -41,6 +44,17 @@ def precache_message(count, total, error_record=None):
         print(f"({count}/{total}) Caching failed with: {error_record}")
 
 
+def precache_file(file, **kwargs):
+    r"""
+    Cache a single file without returning the cache to the caller.
+
+    Returning the cache from a worker process would needlessly pickle all of
+    the file's line offsets, and the offsets of existing valid caches are not
+    loaded at all.
+    """
+    fj.cache.cache_init(file, load_lines=False, **kwargs)
+
+
 def precache_singlethreaded(files, verbose):
     count = 0
     total = len(files)
@@ -48,7 +62,9 @@ def precache_singlethreaded(files, verbose):
         error = False
         error_record = None
         try:
-            _ = fj.cache.cache_init(file)
+            # files are cached one at a time from the main process, so
+            # large files can be scanned with a pool of processes
+            precache_file(file, workers=None)
         except Exception as e:
             error = True
             error_record = repr(e)
@@ -57,11 +73,25 @@ def precache_singlethreaded(files, verbose):
             precache_message(count, total, error_record)
 
 
-def precache_multithreaded(files, threads, verbose):
+def precache_parallel(files, threads, verbose):
     count = 0
     total = len(files)
-    executor = ThreadPoolExecutor(max_workers=threads)
-    futures = [executor.submit(fj.cache.cache_init, file) for file in files]
+    if fj.constants.PRECACHE_EXECUTOR == "thread":
+        executor = ThreadPoolExecutor(max_workers=threads)
+        kwargs = dict()
+    elif fj.constants.PRECACHE_EXECUTOR == "process":
+        executor = ProcessPoolExecutor(max_workers=threads)
+        # files are already cached in parallel, so scan each with one process
+        kwargs = {"workers": 1}
+    else:
+        message = (
+            f"Unknown value for {fj.constants.PRECACHE_EXECUTOR_ENV} "
+            f'environment variable: "{fj.constants.PRECACHE_EXECUTOR}".'
+        )
+        raise ValueError(message)
+    futures = [
+        executor.submit(precache_file, file, **kwargs) for file in files
+    ]
     for future in futures:
         error = False
         error_record = None
@@ -73,6 +103,17 @@ def precache_multithreaded(files, threads, verbose):
         count += 1
         if verbose:
             precache_message(count, total, error_record)
+    executor.shutdown()
+
+
+def precache_multithreaded(files, threads, verbose):
+    r"""Deprecated alias of :func:`precache_parallel`\."""
+    message = (
+        "`precache_multithreaded` is deprecated, use `precache_parallel` "
+        "instead."
+    )
+    warnings.warn(message, DeprecationWarning, stacklevel=2)
+    precache_parallel(files, threads, verbose)
 
 
 def get_precache_arg_parser():
@@ -88,8 +129,8 @@ def get_precache_arg_parser():
         "--threads",
         "-t",
         help=(
-            "The number of threads to use. If 1, threading is not used."
-            "Defaults to 1."
+            "The number of worker processes (or threads) to use. If 1, files "
+            "are cached serially. Defaults to 1."
         ),
         type=int,
         default=1,
@@ -133,6 +174,6 @@ def precache(
     files = [Path(file) for file in args["files"].split(",")]
 
     if args["threads"] > 1:
-        precache_multithreaded(files, args["threads"], args["verbose"])
+        precache_parallel(files, args["threads"], args["verbose"])
     else:
         precache_singlethreaded(files, args["verbose"])
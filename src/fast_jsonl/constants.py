@@ -18,6 +18,7 @@ Library-wide constants.
 Environment variable constants:
 
 * FAST_JSONL_DIR_METHOD: If set to "user", fast-jsonl cache files will be saved to `<user-home>/.local/share/fj_cache/`\. If set to "local", fast-jsonl cache files will be saved to `<jsonl-parent-directory>/.fj_cache/`\. Defaults to "user" if not specified.
+* FAST_JSONL_PRECACHE_EXECUTOR: If set to "process", `fj_precache` caches files in parallel with worker processes. If set to "thread", worker threads are used instead, which may be preferable for I/O-bound workloads (e.g., files on a network file system). Defaults to "process" if not specified.
 
 """
 
@@ -27,3 +28,36 @@ import os
 DIR_METHOD_ENV = "FAST_JSONL_DIR_METHOD"
 DEFAULT_DIR_METHOD = "user"
 DIR_METHOD = os.environ.get(DIR_METHOD_ENV, DEFAULT_DIR_METHOD)
+
+PRECACHE_EXECUTOR_ENV = "FAST_JSONL_PRECACHE_EXECUTOR"
+DEFAULT_PRECACHE_EXECUTOR = "process"
+PRECACHE_EXECUTOR = os.environ.get(
+    PRECACHE_EXECUTOR_ENV,
+    DEFAULT_PRECACHE_EXECUTOR,
+)
+
+# Files at least this large (in bytes) are scanned with multiple processes.
+PARALLEL_SCAN_SIZE = 32 * 1024 * 1024
+
+# Line offsets are found in blocks of about this many bytes when not
+# validating lines.
+SCAN_BLOCK_SIZE = 1024 * 1024
+
+# When a memory-mapped file is read sequentially, the kernel is asked to start
+# reading this many bytes (from the start of the region) immediately.
+WILLNEED_SIZE = 64 * 1024 * 1024
+
+# Files at least this large (in bytes) are memory-mapped for hashing. Smaller
+# files are read in chunks, which avoids the cost of setting up a map.
+MMAP_HASH_SIZE = 64 * 1024
+
+# Files larger than this (in bytes) are hashed with multiple threads when the
+# BLAKE3 algorithm is used. Threading does not pay off for smaller files.
+THREADED_HASH_SIZE = 1024 * 1024
+
+# Incremented whenever the layout of cache files changes. Caches saved with a
+# different version are regenerated.
+CACHE_VERSION = 3
+
+# Leading bytes of binary line offset files.
+OFFSETS_MAGIC = b"FJOF"
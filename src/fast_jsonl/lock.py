@@ -15,11 +15,12 @@
 r"""
 Convenience module for working with filelocks.
 
-:class:`Lock` is initialized automatically when loading caches to ensure that
+:class:`Lock` is initialized automatically when writing caches to ensure that
 multiple concurrent calls for caching do not proceed in parallel.
 This means that all concurrent cache calls will wait until the filelock is
 lifted, and if the JSONL file is not changed (which it should not be changed
 during runtime) redundant caching can be avoided.
+Existing valid caches are loaded without acquiring the lock.
 
 .. note::
    Lockfiles are currently saved in a `.locks` subdirectory of the target
@@ -30,25 +31,36 @@ during runtime) redundant caching can be avoided.
    default) and `<file-name>` is the target cache file name.
 """
 
-from pathlib import Path
+import os
+import functools
 from filelock import FileLock
 
 import fast_jsonl as fj
 
 
+@functools.lru_cache(maxsize=1024)
+def _resolve_filelock_path(lockdir, name):
+    return os.path.realpath(os.path.join(lockdir, name)) + ".lock"
+
+
 class Lock:
     r"""
     Convenience class for handling `filelock.FileLock`\.
     """
 
-    def __init__(self, path):
+    def __init__(self, path, poll_interval=0.05):
         r"""
         Initialize :class:`Lock`\.
 
         Args:
             path (str or pathlike): The target file path.
+            poll_interval (float, optional): The number of seconds to wait
+                between attempts to acquire the lock while it is held
+                elsewhere.
+                Defaults to 0.05.
         """
         self.path = self.get_filelock_path(path)
+        self.poll_interval = poll_interval
         self.lock = FileLock(self.path)
 
     @staticmethod
@@ -60,17 +72,14 @@ class Lock:
         Args:
             path (str or pathlike): The target file path.
         """
-        path = Path(path)
-        lockdir = path.parent / ".locks"
-        if not lockdir.exists():
-            lockdir.mkdir(parents=True, exist_ok=True)
-        lock_path = lockdir / path.name
-        lock_path = lock_path.resolve().as_posix() + ".lock"
-        return lock_path
+        path = os.path.abspath(path)
+        lockdir = os.path.join(os.path.dirname(path), ".locks")
+        fj.cache.ensure_dir(lockdir)
+        return _resolve_filelock_path(lockdir, os.path.basename(path))
 
     def acquire(self):
         r"""Acquire the lock."""
-        self.lock.acquire()
+        self.lock.acquire(poll_interval=self.poll_interval)
 
     def release(self):
         r"""Release the lock."""
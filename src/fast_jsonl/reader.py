@@ -38,23 +38,103 @@ need to be re-generated. Include one of the following flags when initializing
 the reader to enforce this:
 
 * `force_cache=True`\: Always re-cache.
-* `check_cache_time=True`\: Re-cache if the file was modified after caching.
-* `check_cache_hash=True`\: Re-cache if the hash is different from the cached
-  hash.
+* `check_cache="time"`\: Re-cache if the file was modified after caching.
+* `check_cache="auto"`\: Re-cache if the file's hash is different from the
+  cached hash. The file is only hashed if its mtime, size, or inode changed.
+
+The `check_cache_time=True` and `check_cache_hash=True` flags are deprecated
+aliases of `check_cache="time"` and `check_cache="auto"`\.
 
 Note that currently, cache checks are only performed on initial load and JSONL
 data files should not be modified during runtime. We plan on adding continuous
 checks to catch data changes in the future.
+
+The data file is memory-mapped on first read. Call :meth:`Reader.close` (or
+:meth:`Reader.recache`) before modifying or replacing the file; truncating a
+mapped file can crash the reading process, and mapped files cannot be
+truncated on Windows.
 """
 
 import os
-import json
+import sys
+import mmap
+import bisect
+import itertools
+import threading
 from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional, Union
 
 import fast_jsonl as fj
 
 
+def _map_file(path):
+    r"""Memory-map a file for reading, returning b"" for empty files."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""  # empty files cannot be mapped
+        if sys.version_info >= (3, 13) and os.name != "nt":
+            # don't keep a duplicate file descriptor open for the map's
+            # lifetime, so that readers over many files do not exhaust the
+            # descriptor limit
+            data = mmap.mmap(
+                f.fileno(),
+                0,
+                access=mmap.ACCESS_READ,
+                trackfd=False,
+            )
+        else:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    # lines are read by index, so disable readahead (sequential reads advise
+    # their own region, see Reader._iter_lines)
+    _advise_random(data)
+    return data
+
+
+def _advise_random(data, start=0, end=None):
+    r"""
+    Hint that a region of a mapped data file is read at random, disabling
+    readahead. This does nothing for unmapped (empty) or closed files and
+    where `madvise` is not available.
+    """
+    if not isinstance(data, mmap.mmap) or data.closed:
+        return
+    if not hasattr(mmap, "MADV_RANDOM"):  # not available on Windows
+        return
+    if end is None:
+        end = len(data)
+    start -= start % mmap.PAGESIZE  # regions must start on a page boundary
+    if end > start:
+        data.madvise(mmap.MADV_RANDOM, start, end - start)
+
+
+class _LazyCache(dict):
+    r"""
+    Cache data whose line offsets ("lines") are loaded from the cache's offsets
+    file on first access.
+    """
+
+    def __init__(self, cache, cache_path):
+        super().__init__(cache)
+        self.cache_path = cache_path
+
+    def __missing__(self, key):
+        if key != "lines":
+            raise KeyError(key)
+        offsets_path = fj.cache.get_offsets_path(self.cache_path)
+        try:
+            lines = fj.cache.load_offsets(offsets_path, self["count"])
+        except ValueError:
+            message = (
+                f'The line offsets file "{offsets_path}" does not match the '
+                "cache file. It may have been regenerated by another process; "
+                "call `recache` to reload the cache."
+            )
+            raise RuntimeError(message)
+        self["lines"] = lines
+        return lines
+
+
 class Reader:
     r"""Class for reading JSONL files."""
 
@@ -65,6 +145,7 @@ class Reader:
         force_cache: bool = False,
         check_cache_time: bool = False,
         check_cache_hash: bool = False,
+        check_cache: Optional[str] = None,
         **kwargs,
     ):
         r"""
@@ -78,27 +159,42 @@ class Reader:
             force_cache (bool, optional): If True, generate a new cache file
                 regardless of if one already exists.
                 Defaults to False.
-            check_cache_time (bool, optional): If True, overwrite an existing
+            check_cache_time (bool, optional): Deprecated alias of
+                `check_cache="time"`\.
+                Defaults to False.
+            check_cache_hash (bool, optional): Deprecated alias of
+                `check_cache="auto"`\.
+                Defaults to False.
+            check_cache (str, optional): If "time", overwrite an existing
                 cache file if the mtime of the target JSONL file specified by
                 `path` is newer than the recorded mtime in the existing cache
-                file.
-            check_cache_hash (bool, optional): If True, overwrite an existing
-                cache file if the hash of the target JSONL file specified by
-                `path` is newer than the recorded hash in the existing cache
-                file.
+                file. If "auto", overwrite an existing cache file if the hash
+                of the target JSONL file differs from the recorded hash; the
+                file is only hashed if its mtime, size, or inode differ from
+                the recorded values. If None, existing cache files are used
+                without checks.
+                Defaults to None.
 
         Note:
-            The `force_cache` argument overrides the two cache check arguments:
-            if `force_cache=True` is passed, both `check_cache_time` and
-            `check_cache_hash` will be ignored.
+            The `force_cache` argument overrides the cache check arguments:
+            if `force_cache=True` is passed, `check_cache` will be ignored.
         """
+        # resolve the deprecated flags here so that their warnings point at
+        # the caller
+        check_cache = fj.cache.resolve_check_cache(
+            check_cache,
+            check_cache_time=check_cache_time,
+            check_cache_hash=check_cache_hash,
+            stacklevel=2,
+        )
         self.path = path
         self.cache_path = cache_path
         self.cache = None
+        self._data = None
+        self._data_lock = threading.Lock()
         self.recache(
             force_cache=force_cache,
-            check_cache_time=check_cache_time,
-            check_cache_hash=check_cache_hash,
+            check_cache=check_cache,
             **kwargs,
         )
 
@@ -108,21 +204,37 @@ class Reader:
         force_cache: bool = False,
         check_cache_time: bool = False,
         check_cache_hash: bool = False,
+        check_cache: Optional[str] = None,
         **kwargs,
     ):
         r"""Recache the file."""
+        check_cache = fj.cache.resolve_check_cache(
+            check_cache,
+            check_cache_time=check_cache_time,
+            check_cache_hash=check_cache_hash,
+            stacklevel=2,
+        )
         if cache_path is None:
             cache_path = self.cache_path
         else:
             self.cache_path = cache_path
-        self.cache = fj.cache.cache_init(
+        self.close()  # the data file may have been replaced
+        # resolve the default cache path now since the line offsets are only
+        # loaded from it on first read
+        if cache_path is None:
+            cache_path = fj.cache.filepath_to_cachepath(self.path)
+        # offsets are loaded lazily unless `load_lines=True` is passed through
+        # to `cache_init`
+        load_lines = kwargs.pop("load_lines", False)
+        cache = fj.cache.cache_init(
             self.path,
-            cache_path=self.cache_path,
+            cache_path=cache_path,
             force_cache=force_cache,
-            check_cache_time=check_cache_time,
-            check_cache_hash=check_cache_hash,
+            check_cache=check_cache,
+            load_lines=load_lines,
             **kwargs,
         )
+        self.cache = _LazyCache(cache, cache_path)
 
     def force_recache(
         self,
@@ -137,43 +249,119 @@ class Reader:
         """
         self.recache(cache_path=cache_path, force_cache=True)
 
+    def _get_data(self):
+        r"""
+        Return the memory-mapped contents of the data file, mapping the file on
+        first use.
+
+        The map is shared by all threads since reading from it does not move
+        a file position.
+        """
+        data = self._data
+        if data is None:
+            with self._data_lock:
+                if self._data is None:
+                    self._data = _map_file(self.path)
+                data = self._data
+        return data
+
+    def _get_lines(self):
+        r"""
+        Return the line offsets, loading them from the cache's offsets file on
+        first use.
+
+        Valid caches are loaded without their offsets so that readers that
+        are only measured (e.g., with `len`) or never read do not load them.
+        The offsets are also loaded by accessing `reader.cache["lines"]`\.
+        """
+        lines = self.cache.get("lines")
+        if lines is None:
+            with self._data_lock:
+                lines = self.cache["lines"]
+        return lines
+
+    def close(self):
+        r"""
+        Unmap the data file.
+
+        The file is mapped again automatically the next time a line is read.
+        """
+        with self._data_lock:
+            if isinstance(self._data, mmap.mmap):
+                self._data.close()
+            self._data = None
+
+    def __del__(self):
+        if getattr(self, "_data_lock", None) is not None:
+            self.close()
+
+    def __getstate__(self):
+        # the data map and its lock cannot be pickled (e.g., when a DataLoader
+        # sends the reader to its workers); the file is mapped again on first
+        # read after unpickling
+        state = self.__dict__.copy()
+        state["_data"] = None
+        del state["_data_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._data_lock = threading.Lock()
+
     def __len__(self):
-        return len(self.cache["lines"])
+        return self.cache["count"]
 
     def _slice(self, start, stop, step):
-        if step is None:
-            step = 1
-        if start is None:
-            start = 0 if step > 0 else (len(self) - 1)
-        if stop is None:
-            stop = len(self) if step > 0 else 0
-        return [self._getitem(idx) for idx in range(start, stop, step)]
-
-    def _getitem(self, idx):
-        position = self.cache["lines"][idx]
-        f = open(self.path, "r")
-        f.seek(position)
-        line = f.readline()
-        if line.endswith("\n"):
-            line = line[:-1]
-        elif line == "":  # Tried to read from beyond the last line
+        indices = range(len(self))[start:stop:step]
+        if indices.step == 1:
+            # contiguous lines: read straight from the sliced offsets
+            lines = self._get_lines()
+            positions = lines[indices.start : indices.stop]
+            end = lines[indices.stop] if indices.stop < len(lines) else None
+            return list(self._iter_lines(indices, positions, end=end))
+        return self._getitems(indices)
+
+    def _read_line(self, idx):
+        position = self._get_lines()[idx]
+        data = self._get_data()
+        if position >= len(data):  # Tried to read from beyond the last line
             message = (
                 f"The Reader failed to get the {idx} line from the data file. "
                 "It appears that the number of cached lines is greater than "
                 "the number of actual lines."
             )
             raise RuntimeError(message)
+        # search for the end of the line rather than using the next offset
+        # since lines that failed validation are not in the cache
+        end = data.find(b"\n", position)
+        if end == -1:
+            end = len(data)
+        return data[position:end]
+
+    def _parse_line(self, line, idx):
         try:
-            return json.loads(line)
-        except Exception as e:
+            # parsed with orjson when installed, falling back to json
+            return fj.cache._loads(line)
+        except ValueError:  # includes JSON and unicode decoding errors
             message = (
                 f"JSONL data at line {idx} could not be parsed into a JSON "
                 "object. Please check that it is not malformed."
             )
             raise RuntimeError(message)
 
+    def _getitem(self, idx):
+        return self._parse_line(self._read_line(idx), idx)
+
     def _getitems(self, ids):
-        return [self._getitem(idx) for idx in ids]
+        # read lines in file order so that the mapped pages are accessed
+        # sequentially, then parse them in the requested order.
+        ids = list(ids)
+        positions = self._get_lines()
+        lines = [None] * len(ids)
+        order = sorted(range(len(ids)), key=lambda i: positions[ids[i]])
+        for i in order:
+            lines[i] = self._read_line(ids[i])
+        return [self._parse_line(line, idx) for line, idx in zip(lines, ids)]
 
     def __getitem__(self, idx):
         r"""
@@ -192,9 +380,37 @@ class Reader:
             return self._getitems(idx)
         return self._getitem(idx)
 
+    def _iter_lines(self, indices, positions, end=None):
+        r"""
+        Yield the parsed lines at `positions`\, where `indices` are the
+        corresponding line indices and `end` is the offset following the last
+        line (None for the end of the file).
+
+        This skips the per-line dispatch of :meth:`Reader.__getitem__`\. The
+        lines are read in order, so readahead is enabled for their region
+        while they are read.
+        """
+        data = self._get_data()
+        find = data.find
+        size = len(data)
+        end = size if end is None else min(end, size)  # e.g., a stale cache
+        if positions and isinstance(data, mmap.mmap):
+            fj.cache.advise_sequential(data, positions[0], end)
+        try:
+            for idx, position in zip(indices, positions):
+                if position >= size:
+                    self._read_line(idx)  # raises the out of range error
+                line_end = find(b"\n", position)
+                if line_end == -1:
+                    line_end = size
+                yield self._parse_line(data[position:line_end], idx)
+        finally:
+            if positions:
+                _advise_random(data, positions[0], end)
+
     def __iter__(self):
-        for idx in range(len(self)):
-            yield self[idx]
+        # walk the cached offsets in order, reading the map sequentially
+        yield from self._iter_lines(range(len(self)), self._get_lines())
 
 
 class MultiReader(Reader):
@@ -207,6 +423,7 @@ class MultiReader(Reader):
         force_cache: bool = False,
         check_cache_time: bool = False,
         check_cache_hash: bool = False,
+        check_cache: Optional[str] = None,
         **kwargs,
     ):
         r"""
@@ -221,7 +438,9 @@ class MultiReader(Reader):
         just a single path when initializing :class:`Reader`\.
 
         Under the hood, :class:`MultiReader` creates a :class:`Reader` instance
-        for each file path.
+        for each file path. Paths that point to the same file (e.g., a path
+        listed twice or a hard link) share one :class:`Reader` unless they are
+        given different cache paths.
 
         Args:
             path (list[str or pathlike]): List of paths to JSONL files.
@@ -232,30 +451,42 @@ class MultiReader(Reader):
             force_cache (bool, optional): If True, generate a new cache file
                 regardless of if one already exists.
                 Defaults to False.
-            check_cache_time (bool, optional): If True, overwrite an existing
+            check_cache_time (bool, optional): Deprecated alias of
+                `check_cache="time"`\.
+                Defaults to False.
+            check_cache_hash (bool, optional): Deprecated alias of
+                `check_cache="auto"`\.
+                Defaults to False.
+            check_cache (str, optional): If "time", overwrite an existing
                 cache file if the mtime of the target JSONL file specified by
                 `path` is newer than the recorded mtime in the existing cache
-                file.
-            check_cache_hash (bool, optional): If True, overwrite an existing
-                cache file if the hash of the target JSONL file specified by
-                `path` is newer than the recorded hash in the existing cache
-                file.
+                file. If "auto", overwrite an existing cache file if the hash
+                of the target JSONL file differs from the recorded hash; the
+                file is only hashed if its mtime, size, or inode differ from
+                the recorded values. If None, existing cache files are used
+                without checks.
+                Defaults to None.
 
         Note:
-            The `force_cache` argument overrides the two cache check arguments:
-            if `force_cache=True` is passed, both `check_cache_time` and
-            `check_cache_hash` will be ignored.
+            The `force_cache` argument overrides the cache check arguments:
+            if `force_cache=True` is passed, `check_cache` will be ignored.
         """
+        check_cache = fj.cache.resolve_check_cache(
+            check_cache,
+            check_cache_time=check_cache_time,
+            check_cache_hash=check_cache_hash,
+            stacklevel=2,
+        )
         if cache_path is None:
             cache_path = [None for _ in path]
         self.path = path
         self.cache_path = cache_path
-        self.readers = None
+        self.readers = list()
         self.readers_info = None
         self.recache(
             force_cache=force_cache,
-            check_cache_time=check_cache_time,
-            check_cache_hash=check_cache_hash,
+            check_cache=check_cache,
+            **kwargs,
         )
 
     def recache(
@@ -264,51 +495,122 @@ class MultiReader(Reader):
         force_cache: bool = False,
         check_cache_time: bool = False,
         check_cache_hash: bool = False,
+        check_cache: Optional[str] = None,
         **kwargs,
     ):
+        # warn once here rather than once per file from each reader
+        check_cache = fj.cache.resolve_check_cache(
+            check_cache,
+            check_cache_time=check_cache_time,
+            check_cache_hash=check_cache_hash,
+            stacklevel=2,
+        )
         if cache_path is None:
             cache_path = self.cache_path
         else:
             assert isinstance(cache_path, list)
             assert len(cache_path) == len(self.path)
             self.cache_path = cache_path
-        self.readers = [
-            Reader(
+        self.close()
+
+        def make_reader(single_path, single_cache_path):
+            return Reader(
                 single_path,
                 cache_path=single_cache_path,
                 force_cache=force_cache,
-                check_cache_time=check_cache_time,
-                check_cache_hash=check_cache_hash,
+                check_cache=check_cache,
                 **kwargs,
             )
-            for single_path, single_cache_path in zip(
-                self.path,
-                self.cache_path,
-            )
-        ]
-        lengths = [len(reader) for reader in self.readers]
+
+        # a file listed more than once (e.g., the same path or a hard link)
+        # is cached and read by a single shared reader
+        keys = self._reader_keys()
+        unique = dict()
+        for key, args in zip(keys, zip(self.path, self.cache_path)):
+            unique.setdefault(key, args)
+        paths, cache_paths = zip(*unique.values()) if unique else ((), ())
+        if len(unique) > 1:
+            # loading caches is mostly I/O, so load them concurrently
+            max_workers = min(32, len(unique))
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                readers = list(executor.map(make_reader, paths, cache_paths))
+        else:
+            readers = list(map(make_reader, paths, cache_paths))
+        readers = dict(zip(unique, readers))
+        self.readers = [readers[key] for key in keys]
+        # cumulative_sizes[i] is the total number of lines in readers 0..i
         self.readers_info = dict()
-        cumulative = {
-            i: sum(lengths[: i + 1]) for i in range(len(self.readers))
-        }
-        self.readers_info["cumulative_sizes"] = cumulative
-        self.readers_info["instance_reader_map"] = {
-            idx: group
-            for group in range(len(self.readers))
-            for idx in range(
-                cumulative[group - 1] if group > 0 else 0,
-                cumulative[group],
-            )
-        }
+        self.readers_info["cumulative_sizes"] = list(
+            itertools.accumulate(len(reader) for reader in self.readers)
+        )
+
+    def _reader_keys(self):
+        r"""
+        Return a key for each file such that files that are the same file on
+        disk and share a cache path have the same key.
+        """
+        keys = list()
+        for i, path in enumerate(self.path):
+            try:
+                stat = os.stat(path)
+            except OSError:  # let the reader report the missing file
+                stat = None
+            if stat is None or not stat.st_ino:  # no file id to compare
+                keys.append(i)
+            else:
+                keys.append((stat.st_dev, stat.st_ino, self.cache_path[i]))
+        return keys
+
+    def close(self):
+        r"""Close all open handles to the data files."""
+        for reader in self.readers:
+            reader.close()
+
+    def __getstate__(self):
+        return self.__dict__.copy()  # each reader handles its own state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
 
     def __len__(self):
-        return sum(len(reader) for reader in self.readers)
+        cumulative = self.readers_info["cumulative_sizes"]
+        return cumulative[-1] if cumulative else 0
+
+    def _locate(self, idx):
+        r"""Return the reader index and the line index within that reader."""
+        cumulative = self.readers_info["cumulative_sizes"]
+        length = cumulative[-1] if cumulative else 0
+        if idx < 0:
+            idx += length
+        if not 0 <= idx < length:
+            raise IndexError(f"Index out of range for {length} lines.")
+        reader_index = bisect.bisect_right(cumulative, idx)
+        floor = cumulative[reader_index - 1] if reader_index > 0 else 0
+        return reader_index, idx - floor
+
+    def __iter__(self):
+        for reader in self.readers:
+            yield from reader
+
+    def _slice(self, start, stop, step):
+        return self._getitems(range(len(self))[start:stop:step])
 
     def _getitem(self, idx):
-        reader_index = self.readers_info["instance_reader_map"][idx]
-        if reader_index > 0:
-            floor = self.readers_info["cumulative_sizes"][reader_index - 1]
-        else:
-            floor = 0
-        sub_index = idx - floor
-        return self.readers[reader_index][sub_index]
+        reader_index, sub_index = self._locate(idx)
+        return self.readers[reader_index]._getitem(sub_index)
+
+    def _getitems(self, ids):
+        # group indices by reader so that each reader reads one batch
+        ids = list(ids)
+        groups = dict()
+        for i, idx in enumerate(ids):
+            reader_index, sub_index = self._locate(idx)
+            group = groups.setdefault(reader_index, ([], []))
+            group[0].append(i)
+            group[1].append(sub_index)
+        items = [None] * len(ids)
+        for reader_index, (positions, sub_ids) in groups.items():
+            values = self.readers[reader_index]._getitems(sub_ids)
+            for i, value in zip(positions, values):
+                items[i] = value
+        return items
@@ -2,6 +2,8 @@ import os
 import pytest
 import contextlib
 
+import data
+
 
 @contextlib.contextmanager
 def temp_home(home_new):
@@ -26,3 +28,18 @@ def set_temp_home(tmp_path_factory, monkeypatch):
     with temp_home(path):
         yield
     return None
+
+
+@pytest.fixture(scope="session")
+def prebuilt_corpus(tmp_path_factory):
+    r"""
+    Write each dataset in `data.DATASETS` once per session and return a map
+    from dataset names to file paths. Tests copy these files rather than
+    serializing the same data again.
+    """
+    path = tmp_path_factory.mktemp("corpus")
+    corpus = dict()
+    for name, dataset in data.DATASETS.items():
+        corpus[name] = path / f"{name}.jsonl"
+        data.save_data(corpus[name], dataset)
+    return corpus
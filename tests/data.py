@@ -1,16 +1,63 @@
 import json
+import functools
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 
 empty_zero = []
 empty_ten = [{} for _ in range(10)]
 various_ten = [{str(j): (j**2) / 2 for j in range(i)} for i in range(10)]
 
+# datasets that are written once per test session (see conftest.py)
+DATASETS = {
+    "empty_zero": empty_zero,
+    "empty_ten": empty_ten,
+    "various_ten": various_ten,
+}
+
+# cache arguments shared by the cache and reader tests
+CACHE_PARAMS = (
+    {},
+    {"force_cache": True},
+    {"check_cache": "time"},
+    {"check_cache": "auto"},
+)
+
+
+def dataset_name(data):
+    r"""Return the key of `data` in `DATASETS`, or None if it is not there."""
+    for name, dataset in DATASETS.items():
+        if dataset is data:
+            return name
+    return None
+
+
+def dumps(data):
+    r"""
+    Return the JSONL encoding of `data` as bytes. Datasets in `DATASETS` are
+    only encoded once.
+    """
+    name = dataset_name(data)
+    if name is not None:
+        return _dumps_dataset(name)
+    return _dumps(data)
+
+
+@functools.lru_cache(maxsize=None)
+def _dumps_dataset(name):
+    return _dumps(DATASETS[name])
+
+
+def _dumps(data):
+    if orjson is not None:
+        return b"\n".join(map(orjson.dumps, data))
+    return "\n".join(json.dumps(datum) for datum in data).encode()
+
 
 def save_data(path, data, mode="a"):
     assert isinstance(data, list) or isinstance(data, tuple)
-    f = open(path, mode)
-    for i, datum in enumerate(data):
-        line = json.dumps(datum)
-        f.write(line)
-        if i < len(data) - 1:
-            f.write("\n")
+    with open(path, f"{mode}b") as f:
+        f.write(dumps(data))
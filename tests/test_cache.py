@@ -1,10 +1,14 @@
 import os
 import json
-import time
+import mmap
 import pytest
 import hashlib
+import shutil
+import multiprocessing
 import filecmp
 import itertools
+from array import array
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import fast_jsonl as fj
@@ -14,6 +18,30 @@ import data
 import utils
 
 
+# (cache_name, precache, modify_file, params) cases for test_cache_init_params
+CACHE_INIT_CASES = tuple(itertools.product(
+    [None, "cache.json"],
+    [False, True],
+    [None, "time", "content"],
+    data.CACHE_PARAMS,
+))
+
+# (start, end, region) cases for test_advise_sequential, where region is the
+# advised (start, length) in a map of ADVISE_SIZE bytes, or None if nothing
+# should be advised. The map ends partway through a page.
+PAGE = mmap.PAGESIZE
+ADVISE_SIZE = 3 * PAGE + 10
+ADVISE_CASES = (
+    (0, None, (0, ADVISE_SIZE)),
+    (5, None, (0, ADVISE_SIZE)),
+    (5, 6, (0, PAGE)),
+    (PAGE + 1, None, (PAGE, ADVISE_SIZE - PAGE)),
+    (PAGE + 1, 2 * PAGE + 1, (PAGE, 2 * PAGE)),
+    (7, 7, None),
+    (ADVISE_SIZE, None, None),
+)
+
+
 class TestCache:
     def get_home(self):
         if os.environ.get("HOME") is not None:
@@ -29,6 +57,22 @@ class TestCache:
             hashed.hexdigest()
         ))
 
+    def _file_hash_algorithm(self):
+        return fj.cache.HASH_ALGORITHMS[fj.cache.DEFAULT_HASH_ALGORITHM]()
+
+    def _file_hash(self, path, algorithm=None, chunksize=1024 * 1024):
+        if algorithm is None:
+            hashed = self._file_hash_algorithm()
+        else:
+            hashed = fj.cache.HASH_ALGORITHMS[algorithm]()
+        view = memoryview(bytearray(chunksize))
+        with open(path, "rb") as f:
+            while size := f.readinto(view):
+                hashed.update(view[:size])
+        return fj.cache.base10_to_base62(fj.cache.base16_to_base10(
+            hashed.hexdigest()
+        ))
+
     def _get_expected_cachepath_local(self, path):
         target_dir = path.parent / ".fj_cache"
         target_dir.mkdir(parents=True, exist_ok=True)
@@ -58,6 +102,19 @@ class TestCache:
         target_path = self._get_expected_cachepath_user(path)
         assert cache_path.resolve() == target_path.resolve()
 
+    def test_filepath_to_cachepath_user_symlink(self, tmp_path):
+        path_0 = tmp_path / "data_0.jsonl"
+        path_1 = tmp_path / "data_1.jsonl"
+        link = tmp_path / "link.jsonl"
+        link.symlink_to(path_0)
+        cache_path = fj.cache.filepath_to_cachepath_user(link)
+        assert cache_path == fj.cache.filepath_to_cachepath_user(path_0)
+        # a link pointed at a new target maps to the new target's cache
+        link.unlink()
+        link.symlink_to(path_1)
+        cache_path = fj.cache.filepath_to_cachepath_user(link)
+        assert cache_path == fj.cache.filepath_to_cachepath_user(path_1)
+
     @pytest.mark.parametrize("dir_method", ["local", "user"])
     def test_filepath_to_cachepath(self, tmp_path, dir_method):
         path = tmp_path / "file.jsonl"
@@ -69,15 +126,20 @@ class TestCache:
                 target_path = self._get_expected_cachepath_user(path)
             assert cache_path == target_path
 
+    def test_fail_filepath_to_cachepath(self, tmp_path, monkeypatch):
+        path = tmp_path / "file.jsonl"
+        monkeypatch.setattr(fj.constants, "DIR_METHOD", "unknown")
+        with pytest.raises(ValueError):
+            _ = fj.cache.filepath_to_cachepath(path)
+
     def _assert_cache_lines(self, path, cache_lines, target_data):
-        f = open(path, "rb")
-        byte_data = f.read()
-        for i in range(len(cache_lines)):
-            line = byte_data[cache_lines[i]:cache_lines.get(i+1)].decode()
-            if line.endswith("\n"):
-                line = line[:-1]
-            line_data = json.loads(line)
-            assert line_data == target_data[i]
+        with open(path, "rb") as f:
+            lines = f.read().splitlines()
+        assert [json.loads(line) for line in lines] == target_data
+        assert len(cache_lines) == len(lines)
+        for i in range(len(lines)):
+            start = cache_lines[i - 1] + len(lines[i - 1]) + 1 if i else 0
+            assert cache_lines[i] == start
 
     @pytest.mark.parametrize(
         "target_data",
@@ -93,15 +155,244 @@ class TestCache:
             target_data=target_data,
         )
 
+    @pytest.mark.parametrize("validate", [False, True])
+    def test_scan_lines_validate(self, tmp_path, validate):
+        path = tmp_path / "data.jsonl"
+        with open(path, "w") as f:
+            f.write('{"a": 0}\n\n{"a": 1\n{"a": 2}')
+        cache_lines = fj.cache.scan_lines(path, validate=validate)
+        if validate:
+            assert cache_lines == array("Q", [0, 18])
+        else:
+            assert cache_lines == array("Q", [0, 10, 18])
+
+    @pytest.mark.parametrize(
+        "validate,block_size",
+        list(itertools.product([False, True], [4, 1024])),
+    )
+    def test_scan_lines_blank(
+        self,
+        tmp_path,
+        monkeypatch,
+        validate,
+        block_size,
+    ):
+        path = tmp_path / "data.jsonl"
+        with open(path, "wb") as f:
+            f.write(b'{"a":1}\r\n\r\n{"a":2}\r\n  \n{"a":3}')
+        monkeypatch.setattr(fj.constants, "SCAN_BLOCK_SIZE", block_size)
+        cache_lines = fj.cache.scan_lines(path, validate=validate)
+        assert cache_lines == array("Q", [0, 11, 23])
+
+    @pytest.mark.parametrize(
+        "target_data,validate",
+        list(itertools.product(
+            [data.empty_zero, data.various_ten],
+            [False, True],
+        ))
+    )
+    def test_scan_lines_file_hash(self, tmp_path, target_data, validate):
+        path = tmp_path / "data.jsonl"
+        data.save_data(path, target_data)
+        file_hash = self._file_hash_algorithm()
+        cache_lines = fj.cache.scan_lines(
+            path,
+            validate=validate,
+            file_hash=file_hash,
+        )
+        assert cache_lines == fj.cache.scan_lines(path)
+        assert fj.cache.digest_to_base62(file_hash.digest()) == (
+            fj.cache.get_file_hash(path)
+        )
+
+    def test_scan_offsets_file_hash_view(self, tmp_path):
+        path = tmp_path / "data.jsonl"
+        data.save_data(path, data.various_ten)
+        file_hash = self._file_hash_algorithm()
+        updates = []
+
+        class RecordingHash:
+            def update(self, buffer):
+                updates.append(type(buffer))
+                file_hash.update(buffer)
+
+        with open(path, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                start = mm.find(b"\n") + 1
+                offsets = fj.cache.scan_offsets(
+                    mm,
+                    start,
+                    len(mm),
+                    validate=True,
+                    file_hash=RecordingHash(),
+                )
+                expected_hash = self._file_hash_algorithm()
+                expected_hash.update(mm[start:])
+        # the validated region is hashed without copying it out of the map
+        assert updates == [memoryview]
+        assert file_hash.digest() == expected_hash.digest()
+        assert offsets == fj.cache.scan_lines(path)[1:]
+
+    def _recording_map(self, calls, size=ADVISE_SIZE):
+        class Map:
+            def __len__(self):
+                return size
+
+            def madvise(self, option, start, length):
+                calls.append((option, start, length))
+
+        return Map()
+
+    @pytest.mark.skipif(
+        not hasattr(mmap, "MADV_SEQUENTIAL"),
+        reason="madvise is not available (e.g., on Windows)",
+    )
+    @pytest.mark.parametrize("start,end,region", ADVISE_CASES)
+    def test_advise_sequential(
+        self,
+        tmp_path,
+        monkeypatch,
+        start,
+        end,
+        region,
+    ):
+        size = ADVISE_SIZE
+        calls = []
+        monkeypatch.setattr(fj.constants, "WILLNEED_SIZE", mmap.PAGESIZE)
+        fj.cache.advise_sequential(self._recording_map(calls), start, end)
+        if region is None:  # empty regions are not advised
+            assert calls == []
+            return
+        region_start, length = region
+        assert calls == [
+            (mmap.MADV_SEQUENTIAL, region_start, length),
+            (mmap.MADV_WILLNEED, region_start, min(length, mmap.PAGESIZE)),
+        ]
+        for _, call_start, call_length in calls:
+            assert call_start % mmap.PAGESIZE == 0
+            assert call_length % mmap.PAGESIZE == 0 or (
+                call_start + call_length == size
+            )
+
+        # the same regions are accepted by a real map
+        path = tmp_path / "data.jsonl"
+        with open(path, "wb") as f:
+            f.write(b"\n" * size)
+        with open(path, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                fj.cache.advise_sequential(mm, start, end)
+
+    def test_advise_sequential_unavailable(self, monkeypatch):
+        calls = []
+        monkeypatch.delattr(mmap, "MADV_SEQUENTIAL", raising=False)
+        fj.cache.advise_sequential(self._recording_map(calls))
+        assert calls == []
+
+    @pytest.mark.parametrize("block_size", [1, 4, 9, 1024])
+    def test_scan_lines_block_size(self, tmp_path, monkeypatch, block_size):
+        path = tmp_path / "data.jsonl"
+        with open(path, "w") as f:
+            f.write('{"a": 0}\n\n\n{"long": "' + "x" * 20 + '"}\n{"a": 2}')
+        monkeypatch.setattr(fj.constants, "SCAN_BLOCK_SIZE", block_size)
+        cache_lines = fj.cache.scan_lines(path)
+        assert cache_lines == array("Q", [0, 11, 44])
+
+    @pytest.mark.parametrize(
+        "target_data,workers",
+        list(itertools.product(
+            [data.empty_zero, data.empty_ten, data.various_ten],
+            [1, 3, 32],
+        ))
+    )
+    def test_scan_lines_parallel(self, tmp_path, target_data, workers):
+        path = tmp_path / "data.jsonl"
+        data.save_data(path, target_data)
+        cache_lines = fj.cache.scan_lines_parallel(path, workers=workers)
+        assert cache_lines == fj.cache.scan_lines(path)
+
+    def test_generate_cache_data_parallel(self, tmp_path, monkeypatch):
+        path = tmp_path / "data.jsonl"
+        data.save_data(path, data.various_ten)
+        monkeypatch.setattr(fj.constants, "PARALLEL_SCAN_SIZE", 0)
+        cache = fj.cache.generate_cache_data(path, workers=2)
+        assert cache["lines"] == fj.cache.scan_lines(path)
+
+    def test_generate_cache_data_serial(self, tmp_path, monkeypatch):
+        path = tmp_path / "data.jsonl"
+        data.save_data(path, data.various_ten)
+        monkeypatch.setattr(fj.constants, "PARALLEL_SCAN_SIZE", 0)
+        utils.forbid(
+            monkeypatch,
+            fj.cache,
+            "ProcessPoolExecutor",
+            "Files should be scanned serially by default.",
+        )
+        cache = fj.cache.generate_cache_data(path)
+        assert cache["lines"] == fj.cache.scan_lines(path)
+
+    def test_generate_cache_data_thread(self, tmp_path, monkeypatch):
+        path = tmp_path / "data.jsonl"
+        data.save_data(path, data.various_ten)
+        monkeypatch.setattr(fj.constants, "PARALLEL_SCAN_SIZE", 0)
+        utils.forbid(
+            monkeypatch,
+            fj.cache,
+            "ProcessPoolExecutor",
+            "Processes should not be started from a thread.",
+        )
+        with ThreadPoolExecutor(1) as executor:
+            future = executor.submit(
+                fj.cache.generate_cache_data,
+                path,
+                workers=4,
+            )
+            cache = future.result()
+        assert cache["lines"] == fj.cache.scan_lines(path)
+
+    def test_generate_cache_data_daemon(self, tmp_path):
+        path = tmp_path / "data.jsonl"
+        data.save_data(path, data.various_ten)
+        # pool workers are daemonic processes, which cannot have children
+        with multiprocessing.Pool(1) as pool:
+            lines = pool.apply(utils.generate_cache_lines, (path, 4))
+        assert lines == list(fj.cache.scan_lines(path))
+
+    def _set_mtime_ns(self, path, mtime_ns):
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+    @pytest.mark.parametrize(
+        "line,value",
+        [
+            (b'{"a": 0}', {"a": 0}),
+            (b'{"a": 1180591620717411303424}', {"a": 2 ** 70}),
+            (b'{"a": 1', None),
+            (b'{"a": "\xff"}', None),
+        ],
+    )
+    def test_loads(self, line, value):
+        # lines that orjson rejects are retried with json
+        if value is None:
+            with pytest.raises(ValueError):
+                _ = fj.cache._loads(line)
+            assert not fj.cache.is_json(line)
+        else:
+            assert fj.cache._loads(line) == value
+            assert fj.cache.is_json(line)
+
     def test_get_mtime(self, tmp_path):
         path = tmp_path / "data.jsonl"
-        start = time.time()
-        time.sleep(0.01)
         data.save_data(path, data.empty_zero)
-        time.sleep(0.01)
-        end = time.time()
+        self._set_mtime_ns(path, 1_500_000_000_250_000_000)
         mtime = fj.cache.get_mtime(path)
-        assert start <= mtime <= end
+        assert mtime == pytest.approx(1_500_000_000.25)
+
+    def test_get_mtime_ns(self, tmp_path):
+        path = tmp_path / "data.jsonl"
+        data.save_data(path, data.empty_zero)
+        self._set_mtime_ns(path, 1_500_000_000_250_000_000)
+        mtime = fj.cache.get_mtime_ns(path)
+        assert isinstance(mtime, int)
+        assert mtime == 1_500_000_000_250_000_000
 
     @pytest.mark.parametrize(
         "base16,base10",
@@ -120,6 +411,10 @@ class TestCache:
     @pytest.mark.parametrize(
         "base10,base62",
         [
+            (0, "0"),
+            (61, "Z"),
+            (62, "10"),
+            (3_844, "100"),
             (10, "a"),
             (100, "1C"),
             (1_000, "g8"),
@@ -142,46 +437,83 @@ class TestCache:
         hashed = fj.cache.get_text_hash(text)
         assert hashed == target_hash
 
-    def test_get_file_hash(self, tmp_path):
-        path = tmp_path / "data.jsonl"
-        data.save_data(path, data.empty_zero)
-        cache_hash = fj.cache.get_file_hash(path)
-        target_hash = hashlib.sha256()
-        with open(path, "rb") as f:
-            target_hash.update(f.read())
-        target_hash = fj.cache.base10_to_base62(fj.cache.base16_to_base10(
-            target_hash.hexdigest()
+    @pytest.mark.parametrize("text", ["", "asdf", "test.jsonl"])
+    def test_digest_to_base62(self, text):
+        hashed = hashlib.sha256(text.encode())
+        target_base62 = fj.cache.base10_to_base62(fj.cache.base16_to_base10(
+            hashed.hexdigest()
+        ))
+        assert fj.cache.digest_to_base62(hashed.digest()) == target_base62
+
+    @pytest.mark.parametrize(
+        "algorithm,fallback",
+        list(itertools.product(
+            list(fj.cache.HASH_ALGORITHMS),
+            [None, "mmap", "read", "chunks", "threads"],
         ))
+    )
+    def test_get_file_hash(self, tmp_path, monkeypatch, algorithm, fallback):
+        if fallback is not None:
+            monkeypatch.delattr(hashlib, "file_digest", raising=False)
+        if fallback == "mmap":
+            monkeypatch.setattr(fj.constants, "MMAP_HASH_SIZE", 0)
+        if fallback == "threads":
+            monkeypatch.setattr(fj.constants, "THREADED_HASH_SIZE", 0)
+        path = tmp_path / "data.jsonl"
+        data.save_data(path, data.various_ten)
+        # a small chunk size makes the read fallback loop over several chunks
+        chunksize = 7 if fallback == "chunks" else 1024 * 1024
+        cache_hash = fj.cache.get_file_hash(
+            path,
+            algorithm=algorithm,
+            chunksize=chunksize,
+        )
+        target_hash = self._file_hash(path, algorithm, chunksize)
         assert cache_hash == target_hash
 
+    def test_hash_buffer(self):
+        view = fj.cache._hash_buffer(16)
+        assert len(view) == 16
+        assert fj.cache._hash_buffer(8).obj is view.obj
+        larger = len(view.obj) + 1
+        assert len(fj.cache._hash_buffer(larger).obj) == larger
+        with ThreadPoolExecutor(1) as executor:
+            other = executor.submit(fj.cache._hash_buffer, 8).result()
+        assert other.obj is not fj.cache._hash_buffer(8).obj
+
     def test_scan_meta(self, tmp_path):
         path = tmp_path / "data.jsonl"
-
-        start = time.time()
-        time.sleep(0.01)
         data.save_data(path, data.empty_zero)
-        time.sleep(0.01)
-        end = time.time()
+        self._set_mtime_ns(path, 1_500_000_000_250_000_000)
 
         meta = fj.cache.scan_meta(path)
 
-        target_hash = hashlib.sha256()
-        with open(path, "rb") as f:
-            target_hash.update(f.read())
-        target_hash = fj.cache.base10_to_base62(fj.cache.base16_to_base10(
-            target_hash.hexdigest()
-        ))
+        target_hash = self._file_hash(path)
 
         assert meta["hash"] == target_hash
-        assert start <= meta["mtime"] <= end
+        assert meta["mtime"] == pytest.approx(1_500_000_000.25)
+        assert meta["mtime_ns"] == 1_500_000_000_250_000_000
         assert meta["path"] == path.resolve().as_posix()
+        assert meta["size"] == path.stat().st_size
+        assert meta["ino"] == path.stat().st_ino
+
+    def test_scan_meta_symlink(self, tmp_path):
+        path = tmp_path / "data.jsonl"
+        link = tmp_path / "link.jsonl"
+        data.save_data(path, data.various_ten)
+        link.symlink_to(path)
+        meta = fj.cache.scan_meta(str(link))
+        assert meta["path"] == path.resolve().as_posix()
+        assert meta["hash"] == fj.cache.get_file_hash(path)
 
     def test_generate_cache_data(self, tmp_path):
         path = tmp_path / "data.jsonl"
         data.save_data(path, data.empty_zero)
 
         cache_0 = {
+            "version": fj.constants.CACHE_VERSION,
             "meta": fj.cache.scan_meta(path),
+            "count": 0,
             "lines": fj.cache.scan_lines(path),
         }
         cache_1 = fj.cache.generate_cache_data(path)
@@ -192,8 +524,8 @@ class TestCache:
         path_0 = tmp_path / "data_0.json"
         path_1 = tmp_path / "data_1.json"
         with open(path_0, "w") as f:
-            json.dump(data.empty_zero, f)
-        fj.cache.save_json(data.empty_zero, path_1)
+            json.dump(data.various_ten, f, separators=(",", ":"))
+        fj.cache.save_json(data.various_ten, path_1)
         assert filecmp.cmp(path_0, path_1)
 
     def test_load_json(self, tmp_path):
@@ -203,6 +535,20 @@ class TestCache:
         loaded_data = fj.cache.load_json(path)
         assert loaded_data == data.empty_zero
 
+    @pytest.mark.parametrize("offsets", [[], [0], [0, 3, 2**40]])
+    def test_save_load_offsets(self, tmp_path, offsets):
+        path = tmp_path / "cache.json.offsets"
+        fj.cache.save_offsets(array("Q", offsets), path)
+        assert path.stat().st_size == 8 + 8 * len(offsets)
+        assert fj.cache.load_offsets(path) == array("Q", offsets)
+
+    def test_fail_load_offsets(self, tmp_path):
+        path = tmp_path / "cache.json.offsets"
+        with open(path, "wb") as f:
+            f.write(b"[0, 3, 6]")
+        with pytest.raises(ValueError):
+            fj.cache.load_offsets(path)
+
     @pytest.mark.parametrize(
         "target_data",
         [data.empty_zero, data.empty_ten, data.various_ten],
@@ -210,26 +556,17 @@ class TestCache:
     def test_make_cache(self, tmp_path, target_data):
         path = tmp_path / "data.jsonl"
         cache_path = tmp_path / "cache.json"
-
-        start = time.time()
-        time.sleep(0.01)
         data.save_data(path, target_data)
-        time.sleep(0.01)
-        end = time.time()
+        self._set_mtime_ns(path, 1_500_000_000_250_000_000)
 
         cache = fj.cache.make_cache(path, cache_path=cache_path)
         with open(cache_path, "rb") as f:
             cache_loaded = json.load(f)
-        cache_loaded["lines"] = {
-            int(k): v for k, v in cache_loaded["lines"].items()
-        }
+        with open(f"{cache_path}.offsets", "rb") as f:
+            cache_loaded["lines"] = array("Q")
+            cache_loaded["lines"].frombytes(f.read()[8:])
 
-        target_hash = hashlib.sha256()
-        with open(path, "rb") as f:
-            target_hash.update(f.read())
-        target_hash = fj.cache.base10_to_base62(fj.cache.base16_to_base10(
-            target_hash.hexdigest()
-        ))
+        target_hash = self._file_hash(path)
 
         assert cache == cache_loaded
         self._assert_cache_lines(
@@ -237,7 +574,7 @@ class TestCache:
             cache_lines=cache["lines"],
             target_data=target_data,
         )
-        assert start <= cache["meta"]["mtime"] <= end
+        assert cache["meta"]["mtime_ns"] == 1_500_000_000_250_000_000
         assert cache["meta"]["hash"] == target_hash
 
     @pytest.mark.parametrize(
@@ -286,8 +623,8 @@ class TestCache:
         path = tmp_path / "data.jsonl"
         data.save_data(path, data.empty_zero)
         cache = fj.cache.make_cache(path)
-        time.sleep(0.01)
         data.save_data(path, data.empty_ten)
+        self._set_mtime_ns(path, cache["meta"]["mtime_ns"] + 10_000_000)
         assert not fj.cache.cache_time_valid(file_path=path, cache=cache)
 
     def test_cache_hash_valid(self, tmp_path):
@@ -296,6 +633,166 @@ class TestCache:
         cache = fj.cache.make_cache(path)
         assert fj.cache.cache_hash_valid(file_path=path, cache=cache)
 
+    @pytest.mark.parametrize("hash_alg", [None, "sha256", "blake2b"])
+    def test_cache_hash_valid_hash_alg(self, tmp_path, hash_alg):
+        path = tmp_path / "data.jsonl"
+        data.save_data(path, data.various_ten)
+        # caches without "hash_alg" were hashed with sha256
+        meta = {"hash": fj.cache.get_file_hash(path, hash_alg or "sha256")}
+        if hash_alg is not None:
+            meta["hash_alg"] = hash_alg
+        cache = {"meta": meta}
+        assert fj.cache.cache_hash_valid(file_path=path, cache=cache)
+
+    def test_fail_cache_hash_valid_hash_alg(self, tmp_path):
+        path = tmp_path / "data.jsonl"
+        data.save_data(path, data.empty_zero)
+        cache = fj.cache.make_cache(path)
+        cache["meta"]["hash_alg"] = "unknown"
+        assert not fj.cache.cache_hash_valid(file_path=path, cache=cache)
+
+    @pytest.mark.parametrize("check", ["time", "stat"])
+    def test_fail_cache_mtime_ns(self, tmp_path, check):
+        path = tmp_path / "data.jsonl"
+        data.save_data(path, data.empty_ten)
+        mtime = 1_700_000_000_000_000_000
+        os.utime(path, ns=(mtime, mtime))
+        cache = fj.cache.make_cache(path)
+        # a 100 ns change (the resolution of NTFS timestamps) is lost when
+        # mtimes are compared as float seconds
+        os.utime(path, ns=(mtime + 100, mtime + 100))
+        assert os.stat(path).st_mtime == cache["meta"]["mtime"]
+        if check == "time":
+            assert not fj.cache.cache_time_valid(file_path=path, cache=cache)
+        else:
+            assert not fj.cache.cache_stat_valid(file_path=path, cache=cache)
+
+    def test_cache_stat_valid(self, tmp_path):
+        path = tmp_path / "data.jsonl"
+        data.save_data(path, data.empty_ten)
+        cache = fj.cache.make_cache(path)
+        assert fj.cache.cache_stat_valid(file_path=path, cache=cache)
+
+    def test_fail_cache_stat_valid(self, tmp_path):
+        path = tmp_path / "data.jsonl"
+        data.save_data(path, data.empty_ten)
+        cache = fj.cache.make_cache(path)
+        data.save_data(path, data.empty_ten)
+        assert not fj.cache.cache_stat_valid(file_path=path, cache=cache)
+
+    def test_cache_init_skips_hash(self, tmp_path, monkeypatch):
+        path = tmp_path / "data.jsonl"
+        data.save_data(path, data.empty_ten)
+        fj.cache.make_cache(path)
+
+        utils.forbid(
+            monkeypatch,
+            fj.cache,
+            "get_file_hash",
+            "The file should not be hashed.",
+        )
+        _ = fj.cache.cache_init(path, check_cache="auto")
+
+    def test_cache_init_refresh_meta(self, tmp_path, monkeypatch):
+        path = tmp_path / "data.jsonl"
+        cache_path = tmp_path / "cache.json"
+        data.save_data(path, data.various_ten)
+        cache = fj.cache.make_cache(path, cache_path=cache_path)
+        mtime_ns = cache["meta"]["mtime_ns"] + 10_000_000
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+        utils.forbid(
+            monkeypatch,
+            fj.cache,
+            "make_cache",
+            "The cache should not be regenerated.",
+        )
+        refreshed = fj.cache.cache_init(
+            path,
+            cache_path=cache_path,
+            check_cache="auto",
+        )
+        assert refreshed["lines"] == cache["lines"]
+        assert refreshed["meta"]["mtime_ns"] == mtime_ns
+        assert fj.cache.load_cache(cache_path) == refreshed
+
+        utils.forbid(
+            monkeypatch,
+            fj.cache,
+            "get_file_hash",
+            "The file should not be hashed again.",
+        )
+        _ = fj.cache.cache_init(
+            path,
+            cache_path=cache_path,
+            check_cache="auto",
+        )
+
+    def test_refresh_cache_meta_lock(self, tmp_path, monkeypatch):
+        path = tmp_path / "data.jsonl"
+        cache_path = tmp_path / "cache.json"
+        data.save_data(path, data.various_ten)
+        cache = fj.cache.make_cache(path, cache_path=cache_path)
+        cache_id = fj.cache.get_cache_file_id(cache_path)
+        calls = []
+        lock_class = fj.lock.Lock
+
+        class RecordingLock(lock_class):
+            def acquire(self):
+                calls.append("acquire")
+                super().acquire()
+
+            def release(self):
+                calls.append("release")
+                super().release()
+
+        save_json = fj.cache.save_json
+
+        def recording_save_json(*args, **kwargs):
+            calls.append("save")
+            save_json(*args, **kwargs)
+
+        monkeypatch.setattr(fj.lock, "Lock", RecordingLock)
+        monkeypatch.setattr(fj.cache, "save_json", recording_save_json)
+        stat = os.stat(path)
+        fj.cache.refresh_cache_meta(cache, cache_path, stat, cache_id=cache_id)
+        assert calls == ["acquire", "save", "release"]
+
+        # a cache file replaced since it was loaded is not overwritten
+        calls.clear()
+        fj.cache.refresh_cache_meta(cache, cache_path, stat, cache_id=cache_id)
+        assert calls == ["acquire", "release"]
+
+    @pytest.mark.parametrize(
+        "params,check_cache",
+        [
+            ({}, None),
+            ({"check_cache": "time"}, "time"),
+            ({"check_cache_time": True}, "time"),
+            ({"check_cache_hash": True}, "auto"),
+            ({"check_cache_time": True, "check_cache_hash": True}, "auto"),
+            ({"check_cache": "time", "check_cache_hash": True}, "time"),
+        ]
+    )
+    def test_resolve_check_cache(self, params, check_cache):
+        if "check_cache_time" in params or "check_cache_hash" in params:
+            with pytest.warns(DeprecationWarning):
+                resolved = fj.cache.resolve_check_cache(**params)
+        else:
+            resolved = fj.cache.resolve_check_cache(**params)
+        assert resolved == check_cache
+
+    def test_cache_init_deprecated_check_cache(self, tmp_path):
+        path = tmp_path / "data.jsonl"
+        data.save_data(path, data.various_ten)
+        with pytest.warns(DeprecationWarning) as record:
+            _ = fj.cache.cache_init(path, check_cache_hash=True)
+        assert [warning.filename for warning in record] == [__file__]
+
+    def test_fail_resolve_check_cache(self):
+        with pytest.raises(ValueError):
+            _ = fj.cache.resolve_check_cache("hash")
+
     def test_fail_cache_hash_valid(self, tmp_path):
         path = tmp_path / "data.jsonl"
         data.save_data(path, data.empty_zero)
@@ -303,14 +800,31 @@ class TestCache:
         data.save_data(path, data.empty_ten)
         assert not fj.cache.cache_hash_valid(file_path=path, cache=cache)
 
+    def test_fail_cache_hash_valid_size(self, tmp_path, monkeypatch):
+        path = tmp_path / "data.jsonl"
+        data.save_data(path, data.empty_zero)
+        cache = fj.cache.make_cache(path)
+        data.save_data(path, data.empty_ten)
+
+        utils.forbid(
+            monkeypatch,
+            fj.cache,
+            "get_file_hash",
+            "Files of a different size should not be hashed.",
+        )
+        assert not fj.cache.cache_hash_valid(file_path=path, cache=cache)
+
+    def test_fail_cache_hash_valid_same_size(self, tmp_path):
+        path = tmp_path / "data.jsonl"
+        data.save_data(path, [{"a": 0}], mode="w")
+        cache = fj.cache.make_cache(path)
+        data.save_data(path, [{"a": 1}], mode="w")
+        assert os.path.getsize(path) == cache["meta"]["size"]
+        assert not fj.cache.cache_hash_valid(file_path=path, cache=cache)
+
     @pytest.mark.parametrize(
         "cache_name,precache,modify_file,params",
-        list(itertools.product(
-            [None, "cache.json"],
-            [False, True],
-            [None, "time", "content"],
-            [{}, {"force_cache": True}, {"check_cache_time": True}, {"check_cache_hash": True}],
-        ))
+        CACHE_INIT_CASES,
     )
     def test_cache_init_params(
         self,
@@ -334,6 +848,142 @@ class TestCache:
             data.save_data(path, data.various_ten)
         _ = fj.cache.cache_init(path, cache_path=cache_path, **params)
 
+    @pytest.mark.parametrize("dir_method", ["local", "user"])
+    def test_make_cache_dirs(self, tmp_path, dir_method):
+        path = tmp_path / "data.jsonl"
+        data.save_data(path, data.empty_ten)
+        with utils.modify_dir_method(dir_method):
+            cache_path = fj.cache.filepath_to_cachepath(path)
+            assert not cache_path.parent.exists()
+            fj.cache.make_cache(path)
+            assert fj.cache.cache_exists(file_path=path)
+
+    @pytest.mark.parametrize("dir_method", ["local", "user"])
+    def test_make_cache_deleted_dirs(self, tmp_path, dir_method):
+        path = tmp_path / "data.jsonl"
+        data.save_data(path, data.empty_ten)
+        with utils.modify_dir_method(dir_method):
+            cache_path = fj.cache.filepath_to_cachepath(path)
+            fj.cache.make_cache(path)
+            # e.g., the user clears the caches while the process is running
+            shutil.rmtree(cache_path.parent.parent)
+            fj.cache.make_cache(path)
+            assert fj.cache.cache_exists(file_path=path)
+            shutil.rmtree(cache_path.parent.parent)
+            _ = fj.cache.cache_init(path, force_cache=True)
+            assert fj.cache.cache_exists(file_path=path)
+
+    def test_cache_init_old_version(self, tmp_path):
+        path = tmp_path / "data.jsonl"
+        cache_path = tmp_path / "cache.json"
+        data.save_data(path, data.various_ten)
+        cache = fj.cache.generate_cache_data(path)
+        old_cache = {
+            "meta": cache["meta"],
+            "lines": {str(i): pos for i, pos in enumerate(cache["lines"])},
+        }
+        fj.cache.save_json(old_cache, cache_path)
+        assert fj.cache.cache_init(path, cache_path=cache_path) == cache
+
+    def test_cache_init_no_lock(self, tmp_path, monkeypatch):
+        path = tmp_path / "data.jsonl"
+        data.save_data(path, data.empty_ten)
+        cache = fj.cache.make_cache(path)
+
+        utils.forbid(
+            monkeypatch,
+            fj.lock,
+            "Lock",
+            "A valid cache should be read without a lock.",
+        )
+        assert fj.cache.cache_init(path, check_cache="time") == cache
+
+    @pytest.mark.parametrize("precache", [False, True])
+    def test_cache_init_no_reload(self, tmp_path, monkeypatch, precache):
+        path = tmp_path / "data.jsonl"
+        data.save_data(path, data.empty_ten)
+        if precache:
+            fj.cache.make_cache(path)
+
+        utils.forbid(
+            monkeypatch,
+            fj.cache,
+            "load_cache",
+            "A new cache should not be reloaded.",
+        )
+        cache = fj.cache.cache_init(path, force_cache=True)
+        assert len(cache["lines"]) == len(data.empty_ten)
+
+    def test_cache_init_corrupted(self, tmp_path):
+        path = tmp_path / "data.jsonl"
+        cache_path = tmp_path / "cache.json"
+        data.save_data(path, data.various_ten)
+        cache = fj.cache.make_cache(path, cache_path=cache_path)
+        with open(cache_path, "w") as f:
+            f.write('{"version": ')
+        assert fj.cache.cache_init(path, cache_path=cache_path) == cache
+
+    def test_cache_init_no_lines(self, tmp_path, monkeypatch):
+        path = tmp_path / "data.jsonl"
+        cache_path = tmp_path / "cache.json"
+        data.save_data(path, data.various_ten)
+        cache = fj.cache.make_cache(path, cache_path=cache_path)
+
+        with monkeypatch.context() as m:
+            utils.forbid(
+                m,
+                fj.cache,
+                "load_offsets",
+                "Offsets should not be loaded.",
+            )
+            meta_only = fj.cache.cache_init(
+                path,
+                cache_path=cache_path,
+                load_lines=False,
+            )
+        assert "lines" not in meta_only
+        assert meta_only["meta"] == cache["meta"]
+
+        # a missing offsets file still triggers a new cache
+        os.remove(fj.cache.get_offsets_path(cache_path))
+        new_cache = fj.cache.cache_init(
+            path,
+            cache_path=cache_path,
+            load_lines=False,
+        )
+        assert list(new_cache["lines"]) == list(cache["lines"])
+        assert fj.cache.cache_exists(cache_path=cache_path)
+
+    @pytest.mark.parametrize("load_lines", [False, True])
+    def test_cache_init_lines_count(self, tmp_path, load_lines):
+        path = tmp_path / "data.jsonl"
+        cache_path = tmp_path / "cache.json"
+        data.save_data(path, data.various_ten)
+        cache = fj.cache.make_cache(path, cache_path=cache_path)
+        offsets_path = fj.cache.get_offsets_path(cache_path)
+        fj.cache.save_offsets(cache["lines"][:-1], offsets_path)
+        with pytest.raises(ValueError):
+            _ = fj.cache.load_offsets(offsets_path, count=cache["count"])
+
+        # offsets that do not match the cache's count trigger a new cache
+        new_cache = fj.cache.cache_init(
+            path,
+            cache_path=cache_path,
+            load_lines=load_lines,
+        )
+        assert list(new_cache["lines"]) == list(cache["lines"])
+        assert fj.cache.load_offsets(offsets_path) == cache["lines"]
+
+    def test_atomic_open(self, tmp_path):
+        path = tmp_path / "data.json"
+        fj.cache.save_json(data.empty_ten, path)
+        with pytest.raises(RuntimeError):
+            with fj.cache.atomic_open(path) as f:
+                f.write("[")
+                raise RuntimeError()
+        assert fj.cache.load_json(path) == data.empty_ten
+        assert os.listdir(tmp_path) == ["data.json"]
+
     def test_filenotfounderror_cache_init(self, tmp_path):
         path = tmp_path / "data.jsonl"
         with pytest.raises(FileNotFoundError):
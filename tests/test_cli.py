@@ -0,0 +1,62 @@
+import sys
+import pytest
+
+import fast_jsonl as fj
+import fast_jsonl.cli
+
+import data
+
+
+N_FILES = 3
+
+
+class TestCLI:
+    def save_files(self, tmp_path, n=N_FILES):
+        paths = [tmp_path / f"data_{i}.jsonl" for i in range(n)]
+        for path in paths:
+            data.save_data(path, data.various_ten)
+        return paths
+
+    def assert_cached(self, paths):
+        for path in paths:
+            assert fj.cache.cache_exists(file_path=path)
+            assert list(fj.Reader(path)) == data.various_ten
+
+    def test_precache_file(self, tmp_path):
+        (path,) = self.save_files(tmp_path, n=1)
+        assert fj.cli.precache_file(path) is None
+        self.assert_cached([path])
+
+    @pytest.mark.parametrize("executor", ["process", "thread"])
+    def test_precache_parallel(self, tmp_path, monkeypatch, capsys, executor):
+        paths = self.save_files(tmp_path)
+        missing = tmp_path / "missing.jsonl"
+        monkeypatch.setattr(fj.constants, "PRECACHE_EXECUTOR", executor)
+        fj.cli.precache_parallel(paths + [missing], 2, verbose=True)
+        self.assert_cached(paths)
+        lines = capsys.readouterr().out.splitlines()
+        assert len(lines) == N_FILES + 1
+        assert all("completed successfully" in line for line in lines[:-1])
+        assert "FileNotFoundError" in lines[-1]
+
+    def test_fail_precache_parallel(self, tmp_path, monkeypatch):
+        paths = self.save_files(tmp_path)
+        monkeypatch.setattr(fj.constants, "PRECACHE_EXECUTOR", "unknown")
+        with pytest.raises(ValueError):
+            fj.cli.precache_parallel(paths, 2, verbose=False)
+        assert not any(fj.cache.cache_exists(file_path=path) for path in paths)
+
+    def test_precache_multithreaded(self, tmp_path):
+        paths = self.save_files(tmp_path)
+        with pytest.warns(DeprecationWarning):
+            fj.cli.precache_multithreaded(paths, 2, verbose=False)
+        self.assert_cached(paths)
+
+    @pytest.mark.parametrize("threads", [1, 2])
+    def test_precache(self, tmp_path, monkeypatch, threads):
+        paths = self.save_files(tmp_path)
+        files = ",".join(str(path) for path in paths)
+        argv = ["fj_precache", "--files", files, "--threads", str(threads)]
+        monkeypatch.setattr(sys, "argv", argv)
+        fj.cli.precache()
+        self.assert_cached(paths)
@@ -39,3 +39,28 @@ class TestLock:
             measured = (end - start)
             serial = SLEEP_TIME * N_THREADS
             assert measured > serial
+
+    @pytest.mark.parametrize(
+        "kwargs,poll_interval",
+        [({}, 0.05), ({"poll_interval": 0.001}, 0.001)],
+    )
+    def test_poll_interval(self, tmp_path, monkeypatch, kwargs, poll_interval):
+        path = tmp_path / "data.json"
+        lock = fj.lock.Lock(path, **kwargs)
+        calls = []
+
+        def acquire(*args, **acquire_kwargs):
+            calls.append((args, acquire_kwargs))
+
+        # check that the interval reaches the poll loop without timing it
+        monkeypatch.setattr(lock.lock, "acquire", acquire)
+        lock.acquire()
+        assert calls == [((), {"poll_interval": poll_interval})]
+
+    def test_get_filelock_path(self, tmp_path):
+        path = tmp_path / "data.json"
+        lock_path = fj.lock.Lock.get_filelock_path(path)
+        target_path = os.path.realpath(tmp_path / ".locks" / "data.json.lock")
+        assert lock_path == target_path
+        assert (tmp_path / ".locks").is_dir()
+        assert fj.lock.Lock.get_filelock_path(str(path)) == lock_path
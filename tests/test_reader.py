@@ -1,15 +1,67 @@
 import os
 import time
-import copy
+import mmap
+import pickle
+import shutil
 import types
 import pytest
 import itertools
+from array import array
 from pathlib import Path
 from abc import abstractmethod
 
 import fast_jsonl as fj
 
 import data
+import utils
+
+
+# (cache_name, precache, modify_file, params) cases for test_params: every
+# check with and without a stale cache, plus explicit cache paths and
+# modification times.
+PARAMS_CASES = tuple(
+    (None, precache, modify_file, params)
+    for precache, modify_file in [(False, None), (True, "content")]
+    for params in data.CACHE_PARAMS
+) + (
+    (None, True, "time", {}),
+    (None, True, "time", {"check_cache": "auto"}),
+    ("cache.json", False, None, {"force_cache": True}),
+    ("cache.json", True, None, {}),
+    ("cache.json", True, "time", {"check_cache": "time"}),
+    ("cache.json", True, "content", {"check_cache": "auto"}),
+)
+
+# (instances, start, stop, step) cases for test_slice: contiguous, strided,
+# and reversed slices, including empty slices and negative bounds.
+SLICE_CASES = (
+    (data.empty_zero, None, None, None),
+    (data.empty_zero, -3, -1, 2),
+    (data.empty_ten, 0, None, 1),
+    (data.empty_ten, -3, None, 2),
+    (data.various_ten, None, None, None),
+    (data.various_ten, 0, -1, 1),
+    (data.various_ten, -3, None, 1),
+    (data.various_ten, 0, 0, 1),
+    (data.various_ten, None, -1, 2),
+    (data.various_ten, -3, 0, 2),
+    (data.various_ten, None, None, -1),
+    (data.various_ten, 0, None, -1),
+    (data.various_ten, -3, 0, -1),
+    (data.various_ten, None, -1, -1),
+)
+
+# (cache_name, params) cases for test_recache
+RECACHE_CASES = tuple(itertools.product(
+    [None, "cache.json"],
+    data.CACHE_PARAMS,
+))
+
+# (instances, params) cases for test_same_path
+SAME_PATH_CASES = tuple(itertools.product(
+    data.DATASETS.values(),
+    data.CACHE_PARAMS,
+))
 
 
 class BaseTests:
@@ -28,25 +80,57 @@ class BaseTests:
     def make_cache(self, path, cache_path):
         pass
 
+    @pytest.fixture(autouse=True)
+    def set_corpus(self, prebuilt_corpus):
+        self.corpus = prebuilt_corpus
+
+    def save_file(self, path, datum, mode="a"):
+        name = data.dataset_name(datum)
+        # appending to a missing file and overwriting give the same content
+        if name is not None and (mode == "w" or not os.path.exists(path)):
+            shutil.copyfile(self.corpus[name], path)
+        else:
+            data.save_data(path, datum, mode=mode)
+
     def copy_inds(self, inds, n=2):
         if isinstance(inds, types.GeneratorType):
             inds = list(inds)
             return [(i for i in inds) for _ in range(n)]
-        return [copy.deepcopy(inds) for _ in range(n)]
+        # indices are ints, so shallow copies are enough
+        return [list(inds) for _ in range(n)]
 
     def test_init(self, tmp_path):
         path = self.get_path_info(tmp_path)
         self.save_data(path, data.empty_ten)
         _ = self.reader(path)
 
+    @pytest.mark.parametrize("flag", ["check_cache_time", "check_cache_hash"])
+    def test_deprecated_check_cache(self, tmp_path, flag):
+        path = self.get_path_info(tmp_path)
+        self.save_data(path, data.empty_ten)
+        # one warning, attributed to the caller rather than to fast_jsonl
+        with pytest.warns(DeprecationWarning) as record:
+            reader = self.reader(path, **{flag: True})
+        assert [warning.filename for warning in record] == [__file__]
+        with pytest.warns(DeprecationWarning) as record:
+            reader.recache(**{flag: True})
+        assert [warning.filename for warning in record] == [__file__]
+
+    @pytest.mark.parametrize("load_lines", [False, True])
+    def test_load_lines(self, tmp_path, load_lines):
+        path = self.get_path_info(tmp_path)
+        self.save_data(path, data.various_ten)
+        self.make_cache(path, cache_path=None)
+        reader = self.reader(path, load_lines=load_lines)
+        # MultiReader passes the argument on to each file's reader
+        readers = getattr(reader, "readers", [reader])
+        assert all(("lines" in r.cache) == load_lines for r in readers)
+        n_files = self.n_files or 1
+        assert list(reader) == data.various_ten * n_files
+
     @pytest.mark.parametrize(
         "cache_name,precache,modify_file,params",
-        list(itertools.product(
-            [None, "cache.json"],
-            [False, True],
-            [None, "time", "content"],
-            [{}, {"force_cache": True}, {"check_cache_time": True}, {"check_cache_hash": True}],
-        ))
+        PARAMS_CASES,
     )
     def test_params(
         self,
@@ -103,6 +187,7 @@ class BaseTests:
             (data.various_ten, [0, 2, 4]),
             (data.various_ten, (i for i in range(3))),
             (data.various_ten, (i for i in range(2, 6, 2))),
+            (data.various_ten, [7, 1, 4, 1, -1, 0]),
         ],
     )
     def test_multi_index_getitem(self, tmp_path, instances, inds):
@@ -112,21 +197,14 @@ class BaseTests:
         inds_0, inds_1 = self.copy_inds(inds, n=2)  # copy in case of generator
         assert [instances[idx] for idx in inds_0] == reader[inds_1]
 
-    @pytest.mark.parametrize(
-        "instances,start,stop,step",
-        list(itertools.product(
-            [data.empty_zero, data.empty_ten, data.various_ten],
-            [0, None],
-            [0, None, -1],
-            [1, 2, None],
-        ))
-    )
+    @pytest.mark.parametrize("instances,start,stop,step", SLICE_CASES)
     def test_slice(self, tmp_path, instances, start, stop, step):
         # path = tmp_path / "data.jsonl"
         path = self.get_path_info(tmp_path)
         self.save_data(path, instances)
         reader = self.reader(path)[start:stop:step]
-        assert all([a == b for a, b in zip(instances[::step], reader)])
+        n_files = self.n_files or 1
+        assert reader == (instances * n_files)[start:stop:step]
 
     @pytest.mark.parametrize(
         "instances",
@@ -150,13 +228,36 @@ class BaseTests:
         reader = iter(self.reader(path))
         assert all([a == b for a, b in zip(instances, reader)])
 
-    @pytest.mark.parametrize(
-        "cache_name,params",
-        list(itertools.product(
-            [None, "cache.json"],
-            [{}, {"force_cache": True}, {"check_cache_time": True}, {"check_cache_hash": True}],
-        ))
-    )
+    @pytest.mark.parametrize("idx", [10, -11])
+    def test_fail_getitem(self, tmp_path, idx):
+        path = self.get_path_info(tmp_path)
+        self.save_data(path, data.various_ten)
+        reader = self.reader(path)
+        n_files = self.n_files or 1
+        with pytest.raises(IndexError):
+            _ = reader[idx * n_files]
+
+    def test_pickle(self, tmp_path):
+        path = self.get_path_info(tmp_path)
+        self.save_data(path, data.various_ten)
+        reader = self.reader(path)
+        n_files = self.n_files or 1
+        assert reader[0] == data.various_ten[0]  # map the data file(s)
+        unpickled = pickle.loads(pickle.dumps(reader))
+        assert list(unpickled) == data.various_ten * n_files
+        assert list(reader) == data.various_ten * n_files
+
+    def test_close(self, tmp_path):
+        path = self.get_path_info(tmp_path)
+        self.save_data(path, data.various_ten)
+        reader = self.reader(path)
+        n_files = self.n_files or 1
+        assert list(reader) == data.various_ten * n_files
+        reader.close()
+        assert list(reader) == data.various_ten * n_files
+        reader.close()
+
+    @pytest.mark.parametrize("cache_name,params", RECACHE_CASES)
     def test_recache(
         self,
         tmp_path,
@@ -169,10 +270,11 @@ class BaseTests:
 
         reader = self.reader(path)
 
-        if params.get("check_cache_time"):
-            time.sleep(0.01)
-
         self.save_data(path, data.various_ten, mode="w")
+        # move the mtime past the cached one rather than sleeping
+        mtime_ns = time.time_ns() + 10 ** 9
+        for subpath in path if isinstance(path, list) else [path]:
+            os.utime(subpath, ns=(mtime_ns, mtime_ns))
         if cache_name is not None:
             # cache_path = tmp_path / cache_name
             cache_path = self.get_path_info(tmp_path, cache_name)
@@ -184,8 +286,7 @@ class BaseTests:
         # will recache.
         if (
             params.get("force_cache")
-            or params.get("check_cache_time")
-            or params.get("check_cache_hash")
+            or params.get("check_cache") is not None
             or cache_path is not None
         ):
             n_files = self.n_files or 1
@@ -235,7 +336,154 @@ class TestReader(BaseTests):
         fj.cache.make_cache(path, cache_path=cache_path)
 
     def save_data(self, path, datum, **kwargs):
-        data.save_data(path, datum, **kwargs)
+        self.save_file(path, datum, **kwargs)
+
+    def test_json_fallback(self, tmp_path):
+        path = self.get_path_info(tmp_path)
+        with open(path, "w") as f:
+            f.write('{"a": 1180591620717411303424}\n{"a": NaN}\n{"a": \n')
+        reader = self.reader(path)
+        assert reader[0] == {"a": 2 ** 70}
+        assert reader[1]["a"] != reader[1]["a"]
+        with pytest.raises(RuntimeError):
+            _ = reader[2]
+
+    def test_fail_decode(self, tmp_path):
+        path = self.get_path_info(tmp_path)
+        with open(path, "wb") as f:
+            f.write(b'{"a": 0}\n{"a": "\xff"}\n')
+        reader = self.reader(path)
+        assert reader[0] == {"a": 0}
+        with pytest.raises(RuntimeError):
+            _ = reader[1]
+
+    @pytest.mark.parametrize("precache", [False, True])
+    def test_cache_lines_array(self, tmp_path, precache):
+        path = self.get_path_info(tmp_path)
+        self.save_data(path, data.various_ten)
+        if precache:
+            self.make_cache(path, cache_path=None)
+        reader = self.reader(path)
+        assert isinstance(reader.cache["lines"], array)
+        assert reader.cache["lines"].typecode == "Q"
+        assert len(reader.cache["lines"]) == len(data.various_ten)
+
+    def test_lazy_lines(self, tmp_path, monkeypatch):
+        path = self.get_path_info(tmp_path)
+        cache_path = self.get_path_info(tmp_path, "cache.json")
+        self.save_data(path, data.various_ten)
+        self.make_cache(path, cache_path=cache_path)
+
+        with monkeypatch.context() as m:
+            utils.forbid(
+                m,
+                fj.cache,
+                "load_offsets",
+                "Line offsets should not be loaded.",
+            )
+            reader = self.reader(path, cache_path=cache_path)
+            assert len(reader) == len(data.various_ten)
+        assert "lines" not in reader.cache
+        assert list(reader) == data.various_ten
+        assert reader.cache["lines"] == fj.cache.scan_lines(path)
+
+    def test_fail_lines_count(self, tmp_path):
+        path = self.get_path_info(tmp_path)
+        cache_path = self.get_path_info(tmp_path, "cache.json")
+        self.save_data(path, data.various_ten)
+        self.make_cache(path, cache_path=cache_path)
+        reader = self.reader(path, cache_path=cache_path)
+        # e.g., another process regenerated the offsets for a shorter file
+        offsets_path = fj.cache.get_offsets_path(cache_path)
+        fj.cache.save_offsets(array("Q", [0]), offsets_path)
+        with pytest.raises(RuntimeError):
+            _ = reader[0]
+        with pytest.raises(RuntimeError):
+            _ = reader.cache["lines"]
+        reader.recache()
+        assert list(reader) == data.various_ten
+
+    def test_retarget_symlink(self, tmp_path):
+        path_0 = self.get_path_info(tmp_path, "data_0.jsonl")
+        path_1 = self.get_path_info(tmp_path, "data_1.jsonl")
+        link = self.get_path_info(tmp_path, "link.jsonl")
+        self.save_data(path_0, data.empty_ten)
+        self.save_data(path_1, data.various_ten)
+        with utils.modify_dir_method("user"):
+            link.symlink_to(path_0)
+            assert list(self.reader(link)) == data.empty_ten
+            link.unlink()
+            link.symlink_to(path_1)
+            assert list(self.reader(link)) == data.various_ten
+
+    def test_sequential_advice(self, tmp_path, monkeypatch):
+        path = self.get_path_info(tmp_path)
+        self.save_data(path, data.various_ten)
+        reader = self.reader(path)
+        _ = reader[0]  # map the file before recording the hints
+        lines = reader.cache["lines"]
+        size = os.path.getsize(path)
+        calls = []
+
+        def advise_sequential(mm, start=0, end=None):
+            calls.append(("sequential", start, end))
+
+        def advise_random(data, start=0, end=None):
+            calls.append(("random", start, end))
+
+        monkeypatch.setattr(fj.cache, "advise_sequential", advise_sequential)
+        monkeypatch.setattr(fj.reader, "_advise_random", advise_random)
+
+        # iteration and contiguous slices enable readahead for their region
+        # and disable it again when done
+        assert list(reader) == data.various_ten
+        assert calls == [("sequential", 0, size), ("random", 0, size)]
+        calls.clear()
+        assert reader[2:5] == data.various_ten[2:5]
+        assert calls == [
+            ("sequential", lines[2], lines[5]),
+            ("random", lines[2], lines[5]),
+        ]
+        calls.clear()
+        assert reader[-2:] == data.various_ten[-2:]
+        assert calls == [
+            ("sequential", lines[-2], size),
+            ("random", lines[-2], size),
+        ]
+
+        # random access keeps readahead disabled
+        calls.clear()
+        _ = reader[3]
+        _ = reader[::2]
+        _ = reader[[5, 1]]
+        assert calls == []
+
+        # the hints are restored when iteration stops early
+        iterator = iter(reader)
+        _ = next(iterator)
+        iterator.close()
+        assert calls == [("sequential", 0, size), ("random", 0, size)]
+
+    def test_iter_validate(self, tmp_path):
+        path = self.get_path_info(tmp_path)
+        with open(path, "w") as f:
+            f.write('{"a": 0}\n{"a": \n\n{"a": 1}')
+        reader = self.reader(path, validate=True)
+        assert list(reader) == [{"a": 0}, {"a": 1}]
+        assert reader[:] == [{"a": 0}, {"a": 1}]
+
+    def test_map_file(self, tmp_path):
+        path = self.get_path_info(tmp_path)
+        self.save_data(path, data.various_ten)
+        reader = self.reader(path)
+        assert list(reader) == data.various_ten
+        data_map = reader._data
+        assert isinstance(data_map, mmap.mmap)
+        assert reader[-1] == data.various_ten[-1]
+        assert reader._data is data_map
+        reader.close()
+        assert data_map.closed
+        assert reader._data is None
 
 
 class TestMultiReader(BaseTests):
@@ -252,9 +500,16 @@ class TestMultiReader(BaseTests):
             paths.append(path / f"{name.stem}_{i}{name.suffix}")
         return paths
 
-    def save_data(self, path, datum, **kwargs):
-        for subpath in path:
-            data.save_data(subpath, datum, **kwargs)
+    def save_data(self, path, datum, mode="a"):
+        if mode == "a" and os.path.exists(path[0]):
+            for subpath in path:
+                self.save_file(subpath, datum, mode=mode)
+            return
+        # write the data once and copy it; copies rather than hard links so
+        # that the files stay independent (appends, inode checks)
+        self.save_file(path[0], datum, mode=mode)
+        for subpath in path[1:]:
+            shutil.copyfile(path[0], subpath)
 
     def make_cache(self, path, cache_path):
         for i in range(len(path)):
@@ -262,13 +517,42 @@ class TestMultiReader(BaseTests):
             cache_subpath = cache_path[i] if cache_path is not None else None
             fj.cache.make_cache(subpath, cache_path=cache_subpath)
 
-    @pytest.mark.parametrize(
-        "instances,params",
-        list(itertools.product(
-            [data.empty_zero, data.empty_ten, data.various_ten],
-            [{}, {"force_cache": True}, {"check_cache_time": True}, {"check_cache_hash": True}],
-        ))
-    )
+    def test_shared_readers(self, tmp_path):
+        path = self.get_path_info(tmp_path)
+        self.save_data(path, data.various_ten)
+        os.remove(path[1])
+        os.link(path[0], path[1])
+        reader = self.reader([path[0], path[1], path[0], path[2]])
+        assert reader.readers[0] is reader.readers[1] is reader.readers[2]
+        assert reader.readers[3] is not reader.readers[0]
+        assert list(reader) == data.various_ten * 4
+        assert reader[[-1, 0, 25]] == [
+            data.various_ten[-1],
+            data.various_ten[0],
+            data.various_ten[5],
+        ]
+
+    def test_shared_readers_cache_path(self, tmp_path):
+        path = self.get_path_info(tmp_path)[0]
+        self.save_data([path], data.various_ten)
+        cache_path = [tmp_path / "cache_0.json", tmp_path / "cache_1.json"]
+        reader = self.reader([path, path], cache_path=cache_path)
+        assert reader.readers[0] is not reader.readers[1]
+        assert all(os.path.exists(subpath) for subpath in cache_path)
+
+    def test_multi_file_getitems(self, tmp_path):
+        path = self.get_path_info(tmp_path)
+        for i, subpath in enumerate(path):
+            data.save_data(subpath, [{"file": i, "line": j} for j in range(4)])
+        reader = self.reader(path)
+        ids = [9, 0, 5, 11, 1, 4, -1]
+        items = reader[ids]
+        assert items == [reader[idx] for idx in ids]
+        assert [(item["file"], item["line"]) for item in items] == [
+            (2, 1), (0, 0), (1, 1), (2, 3), (0, 1), (1, 0), (2, 3)
+        ]
+
+    @pytest.mark.parametrize("instances,params", SAME_PATH_CASES)
     def test_same_path(self, tmp_path, instances, params):
         n_files = self.n_files or 1
         path = [tmp_path / "data.jsonl"] * n_files
@@ -10,5 +10,23 @@ def modify_dir_method(method_new):
     fj.constants.DIR_METHOD = method_new
     try:
         yield
-    except:
+    finally:
         fj.constants.DIR_METHOD = method_original
+
+
+def forbid(monkeypatch, target, name, message):
+    r"""Replace `target.<name>` with a function that fails the test."""
+
+    def fail(*args, **kwargs):
+        raise AssertionError(message)
+
+    monkeypatch.setattr(target, name, fail)
+
+
+def generate_cache_lines(path, workers):
+    r"""
+    Generate cache data for `path` with the parallel scan enabled for any
+    file size and return its line offsets. Used from worker processes.
+    """
+    fj.constants.PARALLEL_SCAN_SIZE = 0
+    return list(fj.cache.generate_cache_data(path, workers=workers)["lines"])